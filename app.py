@@ -1,23 +1,123 @@
 # main.py
 from fastapi import FastAPI, Request, Form, HTTPException, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import (
+    FileResponse,
+    HTMLResponse,
+    JSONResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
 from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict
+import asyncio
 import json
+import multiprocessing
 import os
 import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
+from pathlib import Path
+
+from sales_store import SalesStore, new_sale_id, write_atomic
+from src.backup.manager import BackupManager, run_periodically
+from src.assets.staticfiles import AssetManifest, PrecompressedStaticFiles
+from src.events.broker import EventBroker
+from src.middleware.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    RouteLimit,
+)
+from src.middleware.profiling import (
+    ProfilerSettings,
+    ProfileStore,
+    ProfilingMiddleware,
+    instrument_templates,
+)
+from shards import (
+    DEFAULT_LOCATION,
+    LOCATION_NAME,
+    discover_locations,
+    location_paths,
+    merge_summaries,
+    summarize_location,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Шарды и пул создаются здесь, а не при импорте: процессы пула
+    # импортируют этот модуль заново (как __mp_main__ при `python app.py`)
+    # и не должны повторно загружать продажи и писать в каталоги шардов
+    shards.update(
+        (location, StoreShard(location)) for location in discover_locations(LOCATIONS_DIR)
+    )
+    stats_pool = ProcessPoolExecutor(
+        max_workers=min(STATS_WORKERS, 8),
+        mp_context=multiprocessing.get_context("forkserver"),
+    )
+    app.state.stats_pool = stats_pool
+
+    backup_task = None
+    if BACKUP_INTERVAL > 0:
+        backup_task = asyncio.create_task(
+            run_periodically(BACKUP_INTERVAL, backup_store, "backup")
+        )
+    yield
+    if backup_task is not None:
+        backup_task.cancel()
+    stats_pool.shutdown(wait=False, cancel_futures=True)
 
-app = FastAPI()
-app.mount("/static", StaticFiles(directory="static"), name="static")
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=500)
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = AssetManifest("static").url
+instrument_templates(templates)
 
 # Настройки
 DATA_FILE = "store_data.json"
 SALES_FILE = "sales_data.json"
+SALES_DIR = "sales_data"
+LOCATIONS_DIR = "locations"
+LOCATION_COOKIE = "location"
+STATS_WORKERS = os.cpu_count() or 1
+ITEM_SALES_LIMIT = 10
+REORDER_VELOCITY_WINDOW = 7
+REORDER_LEAD_DAYS = 14
 ITEMS_PER_PAGE = 5
+EVENT_TOPICS = {"items", "sales"}
+EVENT_QUEUE_SIZE = 100
+
+# Ограничение нагрузки на тяжелые маршруты
+ADMISSION_LIMITS = {
+    "/statistics": RouteLimit(max_concurrency=4, max_queue=16, timeout=2.0),
+    "/statistics/all": RouteLimit(max_concurrency=2, max_queue=8, timeout=5.0),
+    "/items": RouteLimit(max_concurrency=8, max_queue=32, timeout=1.0),
+    "/sales": RouteLimit(max_concurrency=4, max_queue=16, timeout=2.0),
+}
+
+admission = AdmissionController(ADMISSION_LIMITS)
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# Профилирование запросов по требованию администратора
+PROFILE_DIR = "profiles"
+PROFILE_MAX_ENTRIES = 50
+PROFILE_SAMPLE_RATE = 0.0
+PROFILE_SLOW_THRESHOLD = 1.0
+
+profiles = ProfileStore(PROFILE_DIR, max_entries=PROFILE_MAX_ENTRIES)
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profiles,
+    settings=ProfilerSettings(
+        sample_rate=PROFILE_SAMPLE_RATE, slow_threshold=PROFILE_SLOW_THRESHOLD
+    ),
+    authorize=lambda scope: is_authenticated(Request(scope)),
+)
 
 
 # Модель данных
@@ -41,37 +141,69 @@ class Sale(BaseModel):
 
 
 # Инициализация данных
-def load_data() -> Dict[str, Item]:
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
+def load_data(path: str = DATA_FILE) -> Dict[str, Item]:
+    if os.path.exists(path):
+        with open(path, "r") as f:
             data = json.load(f)
             return {item["id"]: Item(**item) for item in data}
     return {}
 
 
-def load_sales() -> Dict[str, Sale]:
-    if os.path.exists(SALES_FILE):
-        with open(SALES_FILE, "r") as f:
-            data = json.load(f)
-            return {sale["id"]: Sale(**sale) for sale in data}
-    return {}
+def save_data(items: Dict[str, Item], path: str = DATA_FILE):
+    data = [item.dict() for item in items.values()]
+    # Через временный файл: воркеры статистики читают его параллельно
+    write_atomic(Path(path), json.dumps(data, indent=2).encode())
 
 
-def save_data(items: Dict[str, Item]):
-    data = [item.dict() for item in items.values()]
-    with open(DATA_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+class StoreShard:
+    """Товары и продажи одной точки продаж в собственном наборе файлов."""
+
+    def __init__(self, location: str):
+        self.location = location
+        self.data_file, self.sales_dir = location_paths(
+            location, LOCATIONS_DIR, DATA_FILE, SALES_DIR
+        )
+        os.makedirs(os.path.dirname(self.data_file) or ".", exist_ok=True)
+        self.items = load_data(self.data_file)
+        # Продажи разбиты по месяцам, старый sales_data.json переносится при первом запуске
+        self.sales = SalesStore(
+            self.sales_dir,
+            Sale,
+            legacy_file=SALES_FILE if location == DEFAULT_LOCATION else None,
+        )
+
+    def save_items(self):
+        save_data(self.items, self.data_file)
 
+    def topic(self, name: str) -> str:
+        return f"{self.location}:{name}"
 
-def save_sales(sales: Dict[str, Sale]):
-    data = [sale.dict() for sale in sales.values()]
-    with open(SALES_FILE, "w") as f:
-        json.dump(data, f, indent=2)
 
+# Шарды по точкам продаж, загружаются в lifespan. Пул процессов для сводной
+# статистики (app.state.stats_pool) использует forkserver: fork в
+# многопоточном сервере может унаследовать захваченные блокировки
+shards: Dict[str, StoreShard] = {}
 
-# Инициализация данных при запуске
-store_items = load_data()
-store_sales = load_sales()
+# Брокер событий для живых обновлений (SSE)
+events = EventBroker(max_queue_size=EVENT_QUEUE_SIZE)
+
+
+# Резервные копии
+BACKUP_DIR = "backups"
+BACKUP_KEEP = 24
+BACKUP_INTERVAL = 3600  # 0 — без периодических копий
+
+backups = BackupManager(BACKUP_DIR, keep=BACKUP_KEEP)
+
+
+async def backup_store():
+    # Снимок берется без await между чтениями: модели не меняются на месте,
+    # а заменяются целиком, поэтому копии ссылок достаточно для согласованности
+    snapshot = {}
+    for shard in shards.values():
+        snapshot[shard.data_file] = list(shard.items.values())
+        snapshot.update(shard.sales.snapshot(shard.sales_dir))
+    await asyncio.to_thread(backups.write_snapshot, snapshot)
 
 
 # Аутентификация (для демонстрации)
@@ -88,6 +220,34 @@ def get_current_datetime() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 
+def get_shard(request: Request) -> StoreShard:
+    return shards.get(request.cookies.get(LOCATION_COOKIE), shards[DEFAULT_LOCATION])
+
+
+def item_sales_summary(shard: StoreShard, item: Item, limit: int) -> dict:
+    # Скорость из индекса недавних продаж, суммы из агрегатов месяцев
+    velocity = shard.sales.item_history(item.id).velocity()
+    daily_rate = velocity[REORDER_VELOCITY_WINDOW]
+    days_of_stock = item.quantity / daily_rate if daily_rate > 0 else None
+    total = shard.sales.item_total(item.id)
+
+    return {
+        "quantity_sold": total["quantity"],
+        "revenue": total["revenue"],
+        "velocity": velocity,
+        "days_of_stock": days_of_stock,
+        "reorder": days_of_stock is not None and days_of_stock < REORDER_LEAD_DAYS,
+        "recent_sales": [sale._asdict() for sale in shard.sales.item_sales(item.id, limit)],
+    }
+
+
+def location_context(request: Request) -> dict:
+    return {"location": get_shard(request).location, "locations": list(shards)}
+
+
+templates.context_processors.append(location_context)
+
+
 # Роуты
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
@@ -98,8 +258,10 @@ async def home(request: Request):
 
 @app.get("/items", response_class=HTMLResponse)
 async def list_items(request: Request, page: int = 1, search: Optional[str] = None):
+    shard = get_shard(request)
+
     # Фильтрация и поиск
-    filtered_items = list(store_items.values())
+    filtered_items = list(shard.items.values())
 
     if search:
         search = search.lower()
@@ -175,6 +337,7 @@ async def create_item(
     if not is_authenticated(request):
         return RedirectResponse(url="/login")
 
+    shard = get_shard(request)
     item_id = str(uuid.uuid4())
     current_time = get_current_datetime()
 
@@ -188,8 +351,9 @@ async def create_item(
         updated_at=current_time,
     )
 
-    store_items[item_id] = new_item
-    save_data(store_items)
+    shard.items[item_id] = new_item
+    shard.save_items()
+    events.publish(shard.topic("items"), "item.created", new_item.dict())
 
     return RedirectResponse(url=f"/item/{item_id}", status_code=303)
 
@@ -200,7 +364,8 @@ async def new_sale_form(request: Request):
         return RedirectResponse(url="/login")
 
     return templates.TemplateResponse(
-        "new_sale.html", {"request": request, "items": store_items.values()}
+        "new_sale.html",
+        {"request": request, "items": get_shard(request).items.values()},
     )
 
 
@@ -211,7 +376,8 @@ async def create_sale(
     if not is_authenticated(request):
         return RedirectResponse(url="/login")
 
-    item = store_items.get(item_id)
+    shard = get_shard(request)
+    item = shard.items.get(item_id)
     if not item:
         return templates.TemplateResponse(
             "error.html", {"request": request, "message": "Item not found"}
@@ -236,21 +402,23 @@ async def create_sale(
         created_at=item.created_at,
         updated_at=get_current_datetime(),
     )
-    store_items[item_id] = updated_item
-    save_data(store_items)
+    shard.items[item_id] = updated_item
+    shard.save_items()
+    events.publish(shard.topic("items"), "item.updated", updated_item.dict())
 
     # Создаем запись о продаже
-    sale_id = str(uuid.uuid4())
+    sale_date = get_current_datetime()
+    sale_id = new_sale_id(sale_date)
     new_sale = Sale(
         id=sale_id,
         item_id=item_id,
         item_name=item.name,
         quantity_sold=quantity_sold,
         sale_price=item.price * quantity_sold,
-        sale_date=get_current_datetime(),
+        sale_date=sale_date,
     )
-    store_sales[sale_id] = new_sale
-    save_sales(store_sales)
+    shard.sales.add(new_sale)
+    events.publish(shard.topic("sales"), "sale.created", new_sale.dict())
 
     return RedirectResponse(url=f"/sale/{sale_id}", status_code=303)
 
@@ -260,7 +428,7 @@ async def sale_detail(request: Request, sale_id: str):
     if not is_authenticated(request):
         return RedirectResponse(url="/login")
 
-    sale = store_sales.get(sale_id)
+    sale = get_shard(request).sales.get(sale_id)
     if not sale:
         return templates.TemplateResponse(
             "error.html", {"request": request, "message": "Sale not found"}
@@ -276,17 +444,17 @@ async def sales_list(request: Request, date: Optional[str] = None, page: int = 1
     if not is_authenticated(request):
         return RedirectResponse(url="/login")
 
-    # Фильтрация по дате
-    filtered_sales = list(store_sales.values())
-    if date:
-        filtered_sales = [s for s in filtered_sales if s.sale_date.startswith(date)]
+    shard = get_shard(request)
+
+    # Фильтрация по дате: читаются только сегменты нужных месяцев
+    date_prefix = date or ""
 
     # Пагинация
-    total_sales = len(filtered_sales)
+    total_sales = shard.sales.count(date_prefix)
     total_pages = (total_sales + ITEMS_PER_PAGE - 1) // ITEMS_PER_PAGE
     start_index = (page - 1) * ITEMS_PER_PAGE
     end_index = min(start_index + ITEMS_PER_PAGE, total_sales)
-    page_sales = filtered_sales[start_index:end_index]
+    page_sales = shard.sales.slice(date_prefix, start_index, end_index)
 
     return templates.TemplateResponse(
         "sales.html",
@@ -306,37 +474,30 @@ async def statistics(request: Request):
     if not is_authenticated(request):
         return RedirectResponse(url="/login")
 
+    shard = get_shard(request)
+
     # Расчет статистики
     today = datetime.now().strftime("%Y-%m-%d")
     this_month = datetime.now().strftime("%Y-%m")
 
     # Статистика за день
-    daily_sales = [s for s in store_sales.values() if s.sale_date.startswith(today)]
-    daily_revenue = sum(s.sale_price for s in daily_sales)
-    daily_items_sold = sum(s.quantity_sold for s in daily_sales)
+    daily = shard.sales.day_totals(today)
+    daily_revenue = daily["revenue"]
+    daily_items_sold = daily["items_sold"]
 
     # Статистика за месяц
-    monthly_sales = [
-        s for s in store_sales.values() if s.sale_date.startswith(this_month)
-    ]
-    monthly_revenue = sum(s.sale_price for s in monthly_sales)
-    monthly_items_sold = sum(s.quantity_sold for s in monthly_sales)
-
-    # Топ продаваемых товаров
-    item_sales = {}
-    for sale in store_sales.values():
-        if sale.item_id not in item_sales:
-            item_sales[sale.item_id] = {
-                "name": sale.item_name,
-                "quantity": 0,
-                "revenue": 0,
-            }
-        item_sales[sale.item_id]["quantity"] += sale.quantity_sold
-        item_sales[sale.item_id]["revenue"] += sale.sale_price
-
-    top_items = sorted(item_sales.values(), key=lambda x: x["quantity"], reverse=True)[
-        :5
-    ]
+    monthly = shard.sales.month_totals(this_month)
+    monthly_revenue = monthly["revenue"]
+    monthly_items_sold = monthly["items_sold"]
+
+    # Топ продаваемых товаров по агрегатам месяцев
+    item_sales = shard.sales.item_totals()
+
+    top_items = sorted(
+        ({"id": item_id, **item} for item_id, item in item_sales.items()),
+        key=lambda x: x["quantity"],
+        reverse=True,
+    )[:5]
 
     return templates.TemplateResponse(
         "statistics.html",
@@ -353,28 +514,125 @@ async def statistics(request: Request):
     )
 
 
+@app.get("/statistics/all", response_class=HTMLResponse)
+async def statistics_all(request: Request):
+    if not is_authenticated(request):
+        return RedirectResponse(url="/login")
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    this_month = datetime.now().strftime("%Y-%m")
+
+    # Каждая точка агрегируется в своем процессе по файлам своего шарда
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                request.app.state.stats_pool,
+                summarize_location,
+                shard.location,
+                shard.data_file,
+                shard.sales_dir,
+                today,
+                this_month,
+            )
+            for shard in shards.values()
+        )
+    )
+    summary = merge_summaries(parts)
+
+    top_items = sorted(
+        summary["items"].values(), key=lambda x: x["quantity"], reverse=True
+    )[:5]
+
+    return templates.TemplateResponse(
+        "statistics_all.html",
+        {
+            "request": request,
+            "daily_revenue": summary["daily_revenue"],
+            "daily_items_sold": summary["daily_items_sold"],
+            "monthly_revenue": summary["monthly_revenue"],
+            "monthly_items_sold": summary["monthly_items_sold"],
+            "location_stats": summary["locations"],
+            "top_items": top_items,
+            "today": today,
+            "this_month": this_month,
+        },
+    )
+
+
+@app.get("/location/{name}")
+async def switch_location(name: str):
+    if name not in shards:
+        raise HTTPException(status_code=404, detail="Location not found")
+
+    response = RedirectResponse(url="/items", status_code=status.HTTP_302_FOUND)
+    response.set_cookie(key=LOCATION_COOKIE, value=name)
+    return response
+
+
+@app.post("/locations")
+async def create_location(request: Request, name: str = Form(...)):
+    if not is_authenticated(request):
+        return RedirectResponse(url="/login")
+
+    name = name.strip().lower()
+    if not LOCATION_NAME.match(name):
+        return templates.TemplateResponse(
+            "error.html",
+            {
+                "request": request,
+                "message": "Location name may contain only a-z, 0-9, '-' and '_'",
+            },
+        )
+
+    if name not in shards:
+        shards[name] = StoreShard(name)
+
+    return RedirectResponse(url=f"/location/{name}", status_code=303)
+
+
 @app.get("/item/{item_id}", response_class=HTMLResponse)
 async def item_detail(request: Request, item_id: str):
-    item = store_items.get(item_id)
+    shard = get_shard(request)
+    item = shard.items.get(item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
+    # Продажи видны только администратору
+    sales_summary = None
+    if is_authenticated(request):
+        sales_summary = item_sales_summary(shard, item, ITEM_SALES_LIMIT)
+
     return templates.TemplateResponse(
         "item_detail.html",
         {
             "request": request,
             "item": item,
+            "sales_summary": sales_summary,
             "is_authenticated": is_authenticated(request),
         },
     )
 
 
+@app.get("/item/{item_id}/sales")
+async def item_sales(request: Request, item_id: str, limit: int = 50):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    shard = get_shard(request)
+    item = shard.items.get(item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+
+    return JSONResponse(item_sales_summary(shard, item, max(limit, 0)))
+
+
 @app.get("/edit-item/{item_id}", response_class=HTMLResponse)
 async def edit_item_form(request: Request, item_id: str):
     if not is_authenticated(request):
         return RedirectResponse(url="/login")
 
-    item = store_items.get(item_id)
+    item = get_shard(request).items.get(item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
@@ -395,7 +653,8 @@ async def update_item(
     if not is_authenticated(request):
         return RedirectResponse(url="/login")
 
-    item = store_items.get(item_id)
+    shard = get_shard(request)
+    item = shard.items.get(item_id)
     if not item:
         raise HTTPException(status_code=404, detail="Item not found")
 
@@ -409,8 +668,9 @@ async def update_item(
         updated_at=get_current_datetime(),
     )
 
-    store_items[item_id] = updated_item
-    save_data(store_items)
+    shard.items[item_id] = updated_item
+    shard.save_items()
+    events.publish(shard.topic("items"), "item.updated", updated_item.dict())
 
     return RedirectResponse(url=f"/item/{item_id}", status_code=303)
 
@@ -420,16 +680,20 @@ async def delete_item(request: Request, item_id: str):
     if not is_authenticated(request):
         return RedirectResponse(url="/login")
 
-    if item_id in store_items:
-        del store_items[item_id]
-        save_data(store_items)
+    shard = get_shard(request)
+    if item_id in shard.items:
+        del shard.items[item_id]
+        shard.save_items()
+        events.publish(shard.topic("items"), "item.deleted", {"id": item_id})
 
     return RedirectResponse(url="/items", status_code=303)
 
 
 @app.get("/low-stock", response_class=HTMLResponse)
 async def low_stock_items(request: Request):
-    low_stock = [item for item in store_items.values() if item.quantity < 5]
+    low_stock = [
+        item for item in get_shard(request).items.values() if item.quantity < 5
+    ]
 
     return templates.TemplateResponse(
         "low_stock.html",
@@ -441,6 +705,60 @@ async def low_stock_items(request: Request):
     )
 
 
+@app.get("/events")
+async def event_stream(request: Request, topics: str = "items,sales"):
+    requested = {t.strip() for t in topics.split(",") if t.strip()}
+    unknown = requested - EVENT_TOPICS
+    if not requested:
+        raise HTTPException(status_code=400, detail="No topics requested")
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown topics: {', '.join(sorted(unknown))}"
+        )
+
+    # Продажи видны только администратору
+    if "sales" in requested and not is_authenticated(request):
+        requested.discard("sales")
+        if not requested:
+            raise HTTPException(status_code=401, detail="Authentication required")
+
+    location = get_shard(request).location
+    subscription = events.subscribe(f"{location}:{topic}" for topic in requested)
+    return StreamingResponse(
+        events.stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/admin/admission")
+async def admission_stats(request: Request):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    return JSONResponse(admission.snapshot())
+
+
+@app.get("/admin/profiles")
+async def profile_list(request: Request):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    return JSONResponse(profiles.list())
+
+
+@app.get("/admin/profiles/{name}")
+async def profile_download(request: Request, name: str, format: str = "prof"):
+    if not is_authenticated(request):
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    path = profiles.path_for(name, ".json" if format == "json" else ".prof")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return FileResponse(path, filename=path.name)
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -14,5 +14,25 @@ class Config(BaseSettings):
     TEMPLATES_DIR: Path = PROJECT_ROOT / "src" / "templates"
     STATIC_DIR: Path = PROJECT_ROOT / "src" / "static"
 
+    # http
+    GZIP_MINIMUM_SIZE: int = 500
+
+    # admission control: путь -> параметры RouteLimit
+    ADMISSION_LIMITS: dict[str, dict] = {
+        "/items": {"max_concurrency": 8, "max_queue": 32, "timeout": 1.0},
+    }
+
+    # profiling: пустой токен отключает профилирование по заголовку
+    PROFILE_TOKEN: str = ""
+    PROFILE_DIR: Path = PROJECT_ROOT / "profiles"
+    PROFILE_MAX_ENTRIES: int = 50
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_SLOW_THRESHOLD: float = 1.0
+
+    # backup: интервал в секундах, 0 отключает резервное копирование
+    BACKUP_DIR: Path = PROJECT_ROOT / "backups"
+    BACKUP_INTERVAL: int = 3600
+    BACKUP_KEEP: int = 24
+
 
 config: Config = Config()
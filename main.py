@@ -1,12 +1,30 @@
+import asyncio
 import logging
 from typing import AsyncGenerator
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import FileResponse
+from sqlalchemy.engine import make_url
+from fastapi.middleware.gzip import GZipMiddleware
 
 from config import config
-from src.items.router import router as item_router
+from src.assets.staticfiles import PrecompressedStaticFiles
+from src.middleware.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    RouteLimit,
+)
+from src.middleware.profiling import (
+    ProfilerSettings,
+    ProfileStore,
+    ProfilingMiddleware,
+    instrument_engine,
+    instrument_templates,
+)
+from src.backup.manager import BackupManager, run_periodically
+from src.database.session import async_engine
+from src.items.router import router as item_router, templates as item_templates
 
 
 logging.basicConfig(
@@ -18,10 +36,35 @@ logging.basicConfig(
 )
 
 
+def is_profile_admin(token: str | None) -> bool:
+    return bool(config.PROFILE_TOKEN) and token == config.PROFILE_TOKEN
+
+
+async def require_admin(x_profile_token: str | None = Header(None)) -> None:
+    if not is_profile_admin(x_profile_token):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+
+backups = BackupManager(config.BACKUP_DIR, keep=config.BACKUP_KEEP)
+
+
+async def backup_database() -> None:
+    await asyncio.to_thread(
+        backups.backup_sqlite, make_url(config.DATABASE_URL).database
+    )
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logging.info("Инициализация приложения...  ")
+    backup_task = None
+    if config.BACKUP_INTERVAL > 0:
+        backup_task = asyncio.create_task(
+            run_periodically(config.BACKUP_INTERVAL, backup_database, "backup")
+        )
     yield
+    if backup_task is not None:
+        backup_task.cancel()
     logging.info("Завершение работы приложения...")
 
 
@@ -29,14 +72,54 @@ def create_app() -> FastAPI:
 
     app: FastAPI = FastAPI(title="seven-day-app", version="0.1.0", lifespan=lifespan)
 
+    app.add_middleware(GZipMiddleware, minimum_size=config.GZIP_MINIMUM_SIZE)
+
+    admission = AdmissionController(
+        {path: RouteLimit(**limit) for path, limit in config.ADMISSION_LIMITS.items()}
+    )
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+    app.state.admission = admission
+
+    profiles = ProfileStore(config.PROFILE_DIR, max_entries=config.PROFILE_MAX_ENTRIES)
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profiles,
+        settings=ProfilerSettings(
+            sample_rate=config.PROFILE_SAMPLE_RATE,
+            slow_threshold=config.PROFILE_SLOW_THRESHOLD,
+        ),
+        authorize=lambda scope: is_profile_admin(
+            dict(scope["headers"]).get(b"x-profile-token", b"").decode()
+        ),
+    )
+    instrument_engine(async_engine.sync_engine)
+    instrument_templates(item_templates)
+
     app.mount(
         "/static",
-        StaticFiles(directory=config.STATIC_DIR),
+        PrecompressedStaticFiles(directory=config.STATIC_DIR),
         name="static",
     )
     
     app.include_router(item_router)
 
+    admin = [Depends(require_admin)]
+
+    @app.get("/admin/admission", tags=["monitoring"], dependencies=admin)
+    async def admission_stats() -> dict:
+        return admission.snapshot()
+
+    @app.get("/admin/profiles", tags=["monitoring"], dependencies=admin)
+    async def profile_list() -> list[dict]:
+        return profiles.list()
+
+    @app.get("/admin/profiles/{name}", tags=["monitoring"], dependencies=admin)
+    async def profile_download(name: str, format: str = "prof"):
+        path = profiles.path_for(name, ".json" if format == "json" else ".prof")
+        if path is None:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        return FileResponse(path, filename=path.name)
+
     return app
 
 
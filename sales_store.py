@@ -0,0 +1,539 @@
+import bisect
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Type
+
+from pydantic import BaseModel
+
+from src.middleware.profiling import timed
+
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних месяцев держим открытыми в памяти
+HOT_MONTHS = 2
+# Сколько закрытых месяцев держим в LRU-кэше
+COLD_CACHE_SIZE = 3
+
+TOTALS_FILE = "totals.json"
+# Продажи закрытых месяцев по товарам: `items/<item_id>.json`
+ITEMS_DIR = "items"
+# id продаж, записанных до разбиения по месяцам, -> месяц
+LEGACY_IDS_FILE = "legacy_ids.json"
+MONTH_ID = re.compile(r"^(\d{4}-\d{2})-")
+
+# Окна скорости продаж в днях
+VELOCITY_WINDOWS = (7, 30)
+
+
+def empty_totals() -> dict:
+    return {"count": 0, "revenue": 0.0, "items_sold": 0, "days": {}, "items": {}}
+
+
+def accumulate(totals: dict, sale: BaseModel) -> None:
+    """Добавляет продажу в агрегаты месяца."""
+    totals["count"] += 1
+    totals["revenue"] += sale.sale_price
+    totals["items_sold"] += sale.quantity_sold
+
+    day = totals["days"].setdefault(
+        sale.sale_date[:10], {"count": 0, "revenue": 0.0, "items_sold": 0}
+    )
+    day["count"] += 1
+    day["revenue"] += sale.sale_price
+    day["items_sold"] += sale.quantity_sold
+
+    item = totals["items"].setdefault(
+        sale.item_id, {"name": sale.item_name, "quantity": 0, "revenue": 0.0}
+    )
+    item["quantity"] += sale.quantity_sold
+    item["revenue"] += sale.sale_price
+
+
+def new_sale_id(sale_date: str) -> str:
+    """id продажи с месяцем в префиксе, чтобы находить сегмент без поиска."""
+    return f"{sale_date[:7]}-{uuid.uuid4()}"
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(path.name + ".tmp")
+    with timed("persistence"):
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+class ItemSale(NamedTuple):
+    sale_date: str
+    sale_id: str
+    quantity_sold: int
+    sale_price: float
+
+    @classmethod
+    def from_sale(cls, sale: BaseModel) -> "ItemSale":
+        return cls(sale.sale_date, sale.id, sale.quantity_sold, sale.sale_price)
+
+
+class ItemSalesHistory:
+    """
+    Продажи одного товара по дате начиная с `floor` и скользящие суммы
+    проданных единиц.
+
+    Начало каждого окна только сдвигается вперед, поэтому суммы
+    обновляются инкрементально: при продаже прибавляется количество,
+    при сдвиге окна вычитаются выпавшие продажи. Продажи до `floor`
+    отбрасываются через `trim`, они остаются в файлах товаров хранилища.
+    """
+
+    def __init__(self, floor: str = "", windows: tuple[int, ...] = VELOCITY_WINDOWS):
+        self.floor = floor
+        self.entries: List[ItemSale] = []
+        self.window_units = {days: 0 for days in windows}
+        self.window_start = {days: 0 for days in windows}
+        self.window_cutoff = {days: "" for days in windows}
+
+    def add(self, sale: BaseModel) -> None:
+        entry = ItemSale.from_sale(sale)
+        if entry.sale_date < self.floor:
+            return
+        index = bisect.bisect_right(self.entries, entry)
+        self.entries.insert(index, entry)
+
+        for days, cutoff in self.window_cutoff.items():
+            if entry.sale_date >= cutoff:
+                self.window_units[days] += entry.quantity_sold
+            else:
+                # Продажа старше окна встала перед его началом
+                self.window_start[days] += 1
+
+    def advance(self, now: Optional[datetime] = None) -> None:
+        """Сдвигает начало окон к `now`, вычитая выпавшие продажи."""
+        now = now or datetime.now()
+        for days in self.window_units:
+            cutoff = (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+            if cutoff > self.window_cutoff[days]:
+                start = self.window_start[days]
+                while start < len(self.entries) and self.entries[start].sale_date < cutoff:
+                    self.window_units[days] -= self.entries[start].quantity_sold
+                    start += 1
+                self.window_start[days] = start
+                self.window_cutoff[days] = cutoff
+
+    def trim(self, floor: str, now: Optional[datetime] = None) -> None:
+        """Отбрасывает продажи до `floor`; он не позже начала самого длинного окна."""
+        self.advance(now)
+        dropped = bisect.bisect_left(self.entries, (floor,))
+        del self.entries[:dropped]
+        for days in self.window_start:
+            self.window_start[days] -= dropped
+        self.floor = max(self.floor, floor)
+
+    def velocity(self, now: Optional[datetime] = None) -> Dict[int, float]:
+        """Проданные единицы в день за каждое окно."""
+        self.advance(now)
+        return {days: units / days for days, units in self.window_units.items()}
+
+    def latest(self, limit: int) -> List[ItemSale]:
+        return self.entries[-limit:][::-1] if limit > 0 else []
+
+
+class SalesStore:
+    """
+    Хранилище продаж, разбитое по месяцам.
+
+    Текущий и недавние месяцы лежат в памяти и в `YYYY-MM.json`.
+    Закрытые месяцы сжимаются в неизменяемые `YYYY-MM.json.gz`, их
+    агрегаты хранятся в `totals.json`, а сами продажи подгружаются по
+    требованию с ограничением LRU.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        model: Type[BaseModel],
+        legacy_file: Optional[str | Path] = None,
+        hot_months: int = HOT_MONTHS,
+        cold_cache_size: int = COLD_CACHE_SIZE,
+    ):
+        self.directory = Path(directory)
+        self.model = model
+        self.hot_months = hot_months
+        self.cold_cache_size = cold_cache_size
+
+        self.hot: Dict[str, Dict[str, BaseModel]] = {}
+        self.hot_totals: Dict[str, dict] = {}
+        self.sealed_totals: Dict[str, dict] = {}
+        self.cold_cache: OrderedDict[str, Dict[str, BaseModel]] = OrderedDict()
+        self.legacy_ids: Dict[str, str] = {}
+        self.item_index: Dict[str, ItemSalesHistory] = {}
+        self.index_floor = ""
+
+        if not self.directory.exists():
+            if legacy_file and os.path.exists(legacy_file):
+                self._migrate_legacy(Path(legacy_file))
+            else:
+                self.directory.mkdir(parents=True)
+        self._load()
+        self.seal_cold_months()
+        # Индекс строится только с `index_floor`: кроме открытых месяцев
+        # читается разве что один закрытый, где начинается окно скорости
+        self.index_floor = self._index_floor()
+        for month in self.months():
+            if month >= self.index_floor[:7]:
+                for sale in self._month_sales(month).values():
+                    self._index(sale)
+
+    # Загрузка и запись сегментов
+
+    def _segment_path(self, month: str) -> Path:
+        return self.directory / f"{month}.json"
+
+    def _sealed_path(self, month: str) -> Path:
+        return self.directory / f"{month}.json.gz"
+
+    def _load(self) -> None:
+        totals_path = self.directory / TOTALS_FILE
+        if totals_path.exists():
+            with open(totals_path, "r") as f:
+                self.sealed_totals = json.load(f)
+
+        for path in sorted(self.directory.glob("*.json.gz")):
+            month = path.name[: -len(".json.gz")]
+            if month not in self.sealed_totals:
+                # Индекс агрегатов потерян или устарел, берем их из сегмента
+                with gzip.open(path, "rt") as f:
+                    self.sealed_totals[month] = json.load(f)["totals"]
+                self._save_sealed_totals()
+
+        for path in sorted(self.directory.glob("????-??.json")):
+            month = path.stem
+            with open(path, "r") as f:
+                data = json.load(f)
+            sales = {sale["id"]: self.model(**sale) for sale in data}
+            self.hot[month] = sales
+            self.hot_totals[month] = empty_totals()
+            for sale in sales.values():
+                accumulate(self.hot_totals[month], sale)
+
+        legacy_path = self.directory / LEGACY_IDS_FILE
+        if legacy_path.exists():
+            with open(legacy_path, "r") as f:
+                self.legacy_ids = json.load(f)
+        else:
+            self._build_legacy_ids()
+
+        if not (self.directory / ITEMS_DIR).exists():
+            self._build_item_sales()
+
+    def _build_legacy_ids(self) -> None:
+        # Однократно для каталогов, созданных до id с месяцем в префиксе
+        for month in self.months():
+            if month in self.hot:
+                ids = self.hot[month]
+            else:
+                ids = self._read_sealed(month)
+            for sale_id in ids:
+                if not MONTH_ID.match(sale_id):
+                    self.legacy_ids[sale_id] = month
+        self._save_legacy_ids()
+
+    def _save_legacy_ids(self) -> None:
+        write_atomic(
+            self.directory / LEGACY_IDS_FILE,
+            json.dumps(self.legacy_ids, indent=2).encode(),
+        )
+
+    def _migrate_legacy(self, legacy_file: Path) -> None:
+        with open(legacy_file, "r") as f:
+            data = json.load(f)
+
+        # Каталог появляется только целиком: после сбоя посреди переноса
+        # следующий запуск начнет его заново, а не увидит часть продаж
+        tmp_dir = self.directory.with_name(self.directory.name + ".tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+
+        months: Dict[str, list] = {}
+        for sale in data:
+            months.setdefault(sale["sale_date"][:7], []).append(sale)
+        for month, sales in months.items():
+            write_atomic(tmp_dir / f"{month}.json", json.dumps(sales, indent=2).encode())
+        self.legacy_ids = {
+            sale["id"]: month for month, sales in months.items() for sale in sales
+        }
+        write_atomic(
+            tmp_dir / LEGACY_IDS_FILE, json.dumps(self.legacy_ids, indent=2).encode()
+        )
+        tmp_dir.rename(self.directory)
+        logger.info(
+            "Продажи из %s разбиты по месяцам в %s", legacy_file, self.directory
+        )
+
+    def _save_month(self, month: str) -> None:
+        data = [sale.dict() for sale in self.hot[month].values()]
+        write_atomic(self._segment_path(month), json.dumps(data, indent=2).encode())
+
+    def _save_sealed_totals(self) -> None:
+        write_atomic(
+            self.directory / TOTALS_FILE,
+            json.dumps(self.sealed_totals, indent=2).encode(),
+        )
+
+    def _hot_window(self, now: Optional[datetime] = None) -> set[str]:
+        now = now or datetime.now()
+        year, month = now.year, now.month
+        window = set()
+        for _ in range(self.hot_months):
+            window.add(f"{year:04d}-{month:02d}")
+            year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+        return window
+
+    def seal_cold_months(self, now: Optional[datetime] = None) -> None:
+        """Сжимает открытые месяцы, выпавшие из горячего окна."""
+        window = self._hot_window(now)
+        for month in sorted(self.hot):
+            if month in window or month > max(window):
+                continue
+
+            totals = self.hot_totals.pop(month)
+            sales = self.hot.pop(month)
+            payload = {
+                "month": month,
+                "totals": totals,
+                "sales": [sale.dict() for sale in sales.values()],
+            }
+            write_atomic(
+                self._sealed_path(month),
+                gzip.compress(json.dumps(payload).encode(), mtime=0),
+            )
+            self.sealed_totals[month] = totals
+            self._save_sealed_totals()
+            self._save_item_sales(month, sales.values(), self.directory / ITEMS_DIR)
+            self._segment_path(month).unlink()
+            logger.info("Месяц %s закрыт, продаж: %s", month, totals["count"])
+
+        if self.item_index:
+            self.index_floor = self._index_floor(now)
+            for history in self.item_index.values():
+                history.trim(self.index_floor, now)
+
+    def _index_floor(self, now: Optional[datetime] = None) -> str:
+        """Начало индекса: открытые месяцы и самое длинное окно скорости."""
+        now = now or datetime.now()
+        window_start = now - timedelta(days=max(VELOCITY_WINDOWS))
+        return min(min(self._hot_window(now)), window_start.strftime("%Y-%m-%d %H:%M:%S"))
+
+    def _item_path(self, item_id: str, directory: Optional[Path] = None) -> Path:
+        return (directory or self.directory / ITEMS_DIR) / f"{item_id}.json"
+
+    def _read_item_sales(self, item_id: str, directory: Optional[Path] = None) -> List[ItemSale]:
+        path = self._item_path(item_id, directory)
+        if not path.exists():
+            return []
+        with timed("persistence"), open(path, "r") as f:
+            return [ItemSale(*entry) for entry in json.load(f)]
+
+    def _save_item_sales(
+        self, month: str, sales: Iterable[BaseModel], directory: Path
+    ) -> None:
+        """Дописывает продажи закрытого месяца в файлы товаров.
+
+        Продажи этого месяца сначала убираются, поэтому повторное закрытие
+        после сбоя не дублирует записи.
+        """
+        by_item: Dict[str, List[ItemSale]] = {}
+        for sale in sales:
+            by_item.setdefault(sale.item_id, []).append(ItemSale.from_sale(sale))
+        for item_id, new_entries in by_item.items():
+            entries = [
+                entry
+                for entry in self._read_item_sales(item_id, directory)
+                if not entry.sale_date.startswith(month)
+            ]
+            entries = sorted(entries + new_entries)
+            write_atomic(
+                self._item_path(item_id, directory), json.dumps(entries).encode()
+            )
+
+    def _build_item_sales(self) -> None:
+        # Однократно для каталогов, созданных до файлов товаров
+        tmp_dir = self.directory / f"{ITEMS_DIR}.tmp"
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir()
+        for month in sorted(self.sealed_totals):
+            self._save_item_sales(month, self._read_sealed(month).values(), tmp_dir)
+        tmp_dir.rename(self.directory / ITEMS_DIR)
+
+    def _read_sealed(self, month: str) -> Dict[str, BaseModel]:
+        with timed("persistence"), gzip.open(self._sealed_path(month), "rt") as f:
+            data = json.load(f)
+        return {sale["id"]: self.model(**sale) for sale in data["sales"]}
+
+    def _month_sales(self, month: str) -> Dict[str, BaseModel]:
+        if month in self.hot:
+            return self.hot[month]
+        if month not in self.sealed_totals:
+            return {}
+
+        if month in self.cold_cache:
+            self.cold_cache.move_to_end(month)
+            return self.cold_cache[month]
+
+        sales = self._read_sealed(month)
+        self.cold_cache[month] = sales
+        while len(self.cold_cache) > self.cold_cache_size:
+            self.cold_cache.popitem(last=False)
+        return sales
+
+    # Публичный интерфейс
+
+    def months(self) -> List[str]:
+        return sorted(set(self.hot) | set(self.sealed_totals))
+
+    def add(self, sale: BaseModel) -> None:
+        month = sale.sale_date[:7]
+        if month not in self.hot:
+            self.seal_cold_months()
+            self.hot[month] = {}
+            self.hot_totals[month] = empty_totals()
+
+        self.hot[month][sale.id] = sale
+        accumulate(self.hot_totals[month], sale)
+        self._index(sale)
+        self._save_month(month)
+
+    def _index(self, sale: BaseModel) -> None:
+        history = self.item_index.get(sale.item_id)
+        if history is None:
+            history = self.item_index[sale.item_id] = ItemSalesHistory(self.index_floor)
+        history.add(sale)
+
+    def item_history(self, item_id: str) -> ItemSalesHistory:
+        """Недавние продажи товара из индекса, без просмотра всех продаж."""
+        return self.item_index.get(item_id) or ItemSalesHistory(self.index_floor)
+
+    def item_sales(self, item_id: str, limit: int) -> List[ItemSale]:
+        """Последние `limit` продаж товара, новые первыми.
+
+        Что старше индекса, лежит в закрытых месяцах и читается из файла
+        товара, а не из сегментов целиком.
+        """
+        history = self.item_history(item_id)
+        result = history.latest(limit)
+        if len(result) < limit:
+            older = [
+                entry
+                for entry in self._read_item_sales(item_id)
+                if entry.sale_date < history.floor
+            ]
+            result += older[::-1][: limit - len(result)]
+        return result
+
+    def item_total(self, item_id: str) -> dict:
+        """Проданные единицы и выручка по товару за все время из агрегатов."""
+        total = {"quantity": 0, "revenue": 0.0}
+        for month in self.months():
+            item = self.month_totals(month)["items"].get(item_id)
+            if item is not None:
+                total["quantity"] += item["quantity"]
+                total["revenue"] += item["revenue"]
+        return total
+
+    def get(self, sale_id: str) -> Optional[BaseModel]:
+        # Месяц берется из id, поэтому читается не больше одного сегмента
+        match = MONTH_ID.match(sale_id)
+        month = match.group(1) if match else self.legacy_ids.get(sale_id)
+        if month is None:
+            return None
+        return self._month_sales(month).get(sale_id)
+
+    def month_totals(self, month: str) -> dict:
+        if month in self.hot_totals:
+            return self.hot_totals[month]
+        return self.sealed_totals.get(month, empty_totals())
+
+    def day_totals(self, day: str) -> dict:
+        days = self.month_totals(day[:7])["days"]
+        return days.get(day, {"count": 0, "revenue": 0.0, "items_sold": 0})
+
+    def item_totals(self) -> Dict[str, dict]:
+        """Суммы по товарам за все время, из агрегатов без чтения продаж."""
+        result: Dict[str, dict] = {}
+        for month in self.months():
+            for item_id, item in self.month_totals(month)["items"].items():
+                merged = result.setdefault(
+                    item_id, {"name": item["name"], "quantity": 0, "revenue": 0.0}
+                )
+                merged["quantity"] += item["quantity"]
+                merged["revenue"] += item["revenue"]
+        return result
+
+    def _count_in_month(self, month: str, prefix: str) -> int:
+        if len(prefix) <= 7:
+            return self.month_totals(month)["count"]
+        if len(prefix) == 10:
+            return self.month_totals(month)["days"].get(prefix, {}).get("count", 0)
+        return sum(
+            1 for s in self._month_sales(month).values() if s.sale_date.startswith(prefix)
+        )
+
+    def _matching_months(self, prefix: str) -> List[str]:
+        return [m for m in self.months() if m.startswith(prefix[:7])]
+
+    def count(self, prefix: str = "") -> int:
+        return sum(self._count_in_month(m, prefix) for m in self._matching_months(prefix))
+
+    def slice(self, prefix: str, start: int, end: int) -> List[BaseModel]:
+        """Продажи по префиксу даты в хронологическом порядке, с `start` по `end`.
+
+        Месяцы, целиком лежащие до `start`, пропускаются по агрегатам
+        без загрузки сегмента.
+        """
+        result: List[BaseModel] = []
+        offset = 0
+        for month in self._matching_months(prefix):
+            month_count = self._count_in_month(month, prefix)
+            if offset + month_count <= start:
+                offset += month_count
+                continue
+            for sale in self._month_sales(month).values():
+                if not sale.sale_date.startswith(prefix):
+                    continue
+                if start <= offset < end:
+                    result.append(sale)
+                offset += 1
+                if offset >= end:
+                    return result
+        return result
+
+    def snapshot(self, prefix: str) -> Dict[str, Any]:
+        """Снимок для резервной копии: закрытые сегменты неизменяемы и
+        копируются файлами, открытые месяцы берутся из памяти. Файлы
+        товаров не копируются, после восстановления они строятся заново."""
+        snapshot: Dict[str, Any] = {
+            f"{prefix}/{TOTALS_FILE}": dict(self.sealed_totals),
+            f"{prefix}/{LEGACY_IDS_FILE}": self.legacy_ids,
+        }
+        for month in self.sealed_totals:
+            snapshot[f"{prefix}/{month}.json.gz"] = self._sealed_path(month)
+        for month, sales in self.hot.items():
+            snapshot[f"{prefix}/{month}.json"] = list(sales.values())
+        return snapshot
+
+    def iter_sales(self) -> Iterator[BaseModel]:
+        """Все продажи по порядку; закрытые месяцы читаются мимо LRU-кэша."""
+        for month in self.months():
+            if month in self.hot:
+                yield from list(self.hot[month].values())
+            else:
+                yield from self._read_sealed(month).values()
@@ -0,0 +1,130 @@
+import gzip
+import json
+import re
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, List
+
+from sales_store import TOTALS_FILE, accumulate, empty_totals
+
+
+DEFAULT_LOCATION = "main"
+LOCATION_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,31}$")
+LOW_STOCK_THRESHOLD = 5
+
+
+def location_paths(
+    location: str, locations_dir: str, data_file: str, sales_dir: str
+) -> tuple[str, str]:
+    """Пути к файлам шарда. Основная точка остается в старых файлах."""
+    if location == DEFAULT_LOCATION:
+        return data_file, sales_dir
+    base = Path(locations_dir) / location
+    return str(base / data_file), str(base / sales_dir)
+
+
+def discover_locations(locations_dir: str) -> List[str]:
+    locations = [DEFAULT_LOCATION]
+    path = Path(locations_dir)
+    if path.exists():
+        locations += sorted(
+            p.name
+            for p in path.iterdir()
+            if p.is_dir() and LOCATION_NAME.match(p.name) and p.name != DEFAULT_LOCATION
+        )
+    return locations
+
+
+def _month_totals(sales_dir: Path, month: str, sealed: Dict[str, dict]) -> dict:
+    if month in sealed:
+        return sealed[month]
+    path = sales_dir / f"{month}.json"
+    if path.exists():
+        totals = empty_totals()
+        with open(path, "r") as f:
+            for sale in json.load(f):
+                accumulate(totals, SimpleNamespace(**sale))
+        return totals
+    path = sales_dir / f"{month}.json.gz"
+    if path.exists():
+        with gzip.open(path, "rt") as f:
+            return json.load(f)["totals"]
+    return empty_totals()
+
+
+def summarize_location(
+    location: str, data_file: str, sales_dir: str, today: str, this_month: str
+) -> dict:
+    """
+    Частичные агрегаты одной точки. Выполняется в отдельном процессе и
+    только читает файлы шарда, поэтому не трогает состояние приложения.
+    """
+    stock = {"item_count": 0, "units_in_stock": 0, "stock_value": 0.0, "low_stock": 0}
+    if Path(data_file).exists():
+        with open(data_file, "r") as f:
+            for item in json.load(f):
+                stock["item_count"] += 1
+                stock["units_in_stock"] += item["quantity"]
+                stock["stock_value"] += item["quantity"] * item["price"]
+                stock["low_stock"] += item["quantity"] < LOW_STOCK_THRESHOLD
+
+    sales_path = Path(sales_dir)
+    sealed: Dict[str, dict] = {}
+    if (sales_path / TOTALS_FILE).exists():
+        with open(sales_path / TOTALS_FILE, "r") as f:
+            sealed = json.load(f)
+
+    months = set(sealed)
+    if sales_path.exists():
+        months |= {p.stem for p in sales_path.glob("????-??.json")}
+        months |= {p.name[: -len(".json.gz")] for p in sales_path.glob("*.json.gz")}
+
+    items: Dict[str, dict] = {}
+    monthly = empty_totals()
+    for month in sorted(months):
+        totals = _month_totals(sales_path, month, sealed)
+        if month == this_month:
+            monthly = totals
+        for item_id, item in totals["items"].items():
+            merged = items.setdefault(
+                item_id, {"name": item["name"], "quantity": 0, "revenue": 0.0}
+            )
+            merged["quantity"] += item["quantity"]
+            merged["revenue"] += item["revenue"]
+
+    daily = monthly["days"].get(today, {"count": 0, "revenue": 0.0, "items_sold": 0})
+    return {
+        "location": location,
+        "stock": stock,
+        "daily_revenue": daily["revenue"],
+        "daily_items_sold": daily["items_sold"],
+        "monthly_revenue": monthly["revenue"],
+        "monthly_items_sold": monthly["items_sold"],
+        "items": items,
+    }
+
+
+def merge_summaries(parts: List[dict]) -> dict:
+    """Сводит частичные агрегаты точек в общие по компании."""
+    merged = {
+        "daily_revenue": 0.0,
+        "daily_items_sold": 0,
+        "monthly_revenue": 0.0,
+        "monthly_items_sold": 0,
+        "items": {},
+        "locations": [],
+    }
+    for part in parts:
+        for key in ("daily_revenue", "daily_items_sold", "monthly_revenue", "monthly_items_sold"):
+            merged[key] += part[key]
+        # id товаров у каждой точки свои, поэтому по компании сводим по названию
+        for item in part["items"].values():
+            total = merged["items"].setdefault(
+                item["name"], {"name": item["name"], "quantity": 0, "revenue": 0.0}
+            )
+            total["quantity"] += item["quantity"]
+            total["revenue"] += item["revenue"]
+        merged["locations"].append(
+            {key: value for key, value in part.items() if key != "items"}
+        )
+    return merged
@@ -0,0 +1,127 @@
+"""
+Сборка статики: fingerprint по содержимому и предварительное сжатие.
+
+Использование:
+    python -m src.assets.build static src/static
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен, тогда собираем только gzip
+    brotli = None
+
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+# Манифесты последних сборок, их файлы не удаляются
+HISTORY_NAME = "history.json"
+KEEP_BUILDS = 5
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg", ".json", ".txt", ".html", ".map"}
+MIN_COMPRESS_SIZE = 256
+
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def write_json(path: Path, data) -> None:
+    # Через временный файл: сервер перечитывает манифест на лету
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def prune(dist_dir: Path, manifests: list[dict[str, str]]) -> None:
+    """Удаляет файлы, на которые не ссылается ни один из хранимых манифестов."""
+    keep = {
+        Path(path).relative_to(DIST_DIR)
+        for manifest in manifests
+        for path in manifest.values()
+    }
+    for path in sorted(dist_dir.rglob("*")):
+        if not path.is_file() or path.parent == dist_dir and path.name in (
+            MANIFEST_NAME,
+            HISTORY_NAME,
+        ):
+            continue
+        relative = path.relative_to(dist_dir)
+        if relative in keep:
+            continue
+        if relative.suffix in (".gz", ".br") and relative.with_suffix("") in keep:
+            continue
+        path.unlink()
+
+
+def build(static_dir: Path) -> dict[str, str]:
+    """
+    Собирает `static_dir/dist` и возвращает манифест `исходный путь -> путь`.
+
+    Файлы прошлых сборок не удаляются сразу: на них ссылаются закэшированные
+    страницы и сервер, еще не перечитавший манифест. Хранятся файлы
+    последних `KEEP_BUILDS` сборок.
+    """
+    static_dir = Path(static_dir)
+    dist_dir = static_dir / DIST_DIR
+    dist_dir.mkdir(parents=True, exist_ok=True)
+
+    history: list[dict[str, str]] = []
+    if (dist_dir / HISTORY_NAME).exists():
+        with open(dist_dir / HISTORY_NAME, "r") as f:
+            history = json.load(f)
+
+    manifest: dict[str, str] = {}
+    for source in sorted(static_dir.rglob("*")):
+        if not source.is_file():
+            continue
+        relative = source.relative_to(static_dir)
+        if relative.parts[0] == DIST_DIR:
+            continue
+
+        data = source.read_bytes()
+        hashed = relative.with_name(f"{relative.stem}.{fingerprint(data)}{relative.suffix}")
+        target = dist_dir / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+
+        if source.suffix in COMPRESSIBLE_SUFFIXES and len(data) >= MIN_COMPRESS_SIZE:
+            # mtime=0, чтобы повторная сборка давала идентичные файлы
+            target.with_name(target.name + ".gz").write_bytes(
+                gzip.compress(data, compresslevel=9, mtime=0)
+            )
+            if brotli is not None:
+                target.with_name(target.name + ".br").write_bytes(
+                    brotli.compress(data, quality=11)
+                )
+
+        manifest[relative.as_posix()] = (Path(DIST_DIR) / hashed).as_posix()
+
+    if not history or history[-1] != manifest:
+        history = (history + [manifest])[-KEEP_BUILDS:]
+    write_json(dist_dir / HISTORY_NAME, history)
+    # Манифест пишется последним, когда все его файлы уже на месте
+    write_json(dist_dir / MANIFEST_NAME, manifest)
+    prune(dist_dir, history)
+    return manifest
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Использование: python -m src.assets.build <static_dir> [...]")
+        sys.exit(1)
+
+    for static_dir in sys.argv[1:]:
+        manifest = build(Path(static_dir))
+        print(f"{static_dir}: собрано файлов {len(manifest)}")
+    if brotli is None:
+        print("brotli не установлен, .br варианты пропущены")
+
+
+if __name__ == "__main__":
+    main()
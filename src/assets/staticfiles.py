@@ -0,0 +1,132 @@
+import json
+import mimetypes
+import stat
+import time
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from .build import DIST_DIR, MANIFEST_NAME
+
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def accepted_encodings(headers: Headers) -> set[str]:
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        name, _, params = part.partition(";")
+        key, _, value = params.strip().partition("=")
+        if key.strip() == "q":
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if name.strip():
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles, который отдает заранее сжатые .br/.gz варианты по
+    Accept-Encoding и помечает fingerprinted файлы из dist/ как immutable.
+    """
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = None
+        if scope["method"] in ("GET", "HEAD"):
+            response = await self._precompressed_response(path, scope)
+        if response is None:
+            response = await super().get_response(path, scope)
+
+        if response.status_code in (200, 304):
+            is_hashed = Path(path).parts[:1] == (DIST_DIR,)
+            response.headers["Cache-Control"] = (
+                IMMUTABLE_CACHE if is_hashed else REVALIDATE_CACHE
+            )
+            # Для несжатых ответов Vary добавит GZipMiddleware, если будет сжимать
+            if "content-encoding" in response.headers:
+                response.headers.add_vary_header("Accept-Encoding")
+        return response
+
+    async def _precompressed_response(self, path: str, scope: Scope) -> Response | None:
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers)
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(
+                self.lookup_path, path + suffix
+            )
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+
+            media_type = mimetypes.guess_type(path)[0] or "text/plain"
+            response = FileResponse(
+                full_path,
+                stat_result=stat_result,
+                media_type=media_type,
+                headers={"Content-Encoding": encoding},
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
+
+
+class AssetManifest:
+    """
+    Переводит исходный путь к файлу статики в fingerprinted URL.
+
+    Манифест перечитывается, когда файл заменен новой сборкой (проверка не чаще
+    раза в `check_interval` секунд), поэтому новая сборка подхватывается
+    без перезапуска.
+    """
+
+    def __init__(
+        self, static_dir: Path, url_prefix: str = "/static", check_interval: float = 1.0
+    ):
+        self.url_prefix = url_prefix.rstrip("/")
+        self.manifest_path = Path(static_dir) / DIST_DIR / MANIFEST_NAME
+        self.check_interval = check_interval
+        self.entries: dict[str, str] = {}
+        self._version: tuple[int, int] | None = None
+        self._checked = 0.0
+        self.reload()
+
+    def _manifest_version(self) -> tuple[int, int] | None:
+        # Сборка заменяет манифест через os.replace, поэтому меняется и inode
+        try:
+            stat_result = self.manifest_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat_result.st_ino, stat_result.st_mtime_ns
+
+    def reload(self) -> None:
+        self._version = self._manifest_version()
+        self._checked = time.monotonic()
+        if self._version is not None:
+            with open(self.manifest_path, "r") as f:
+                self.entries = json.load(f)
+        else:
+            self.entries = {}
+
+    def refresh(self) -> None:
+        if time.monotonic() - self._checked < self.check_interval:
+            return
+        self._checked = time.monotonic()
+        if self._manifest_version() != self._version:
+            self.reload()
+
+    def url(self, path: str) -> str:
+        self.refresh()
+        # Без сборки отдаем исходный файл, чтобы dev-окружение работало как раньше
+        return f"{self.url_prefix}/{self.entries.get(path, path)}"
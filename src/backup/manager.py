@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+
+class BackupManager:
+    """
+    Каталог резервных копий: каждая копия — подкаталог с меткой времени
+    и `manifest.json`. Хранятся только `keep` последних копий.
+    """
+
+    def __init__(self, directory: str | Path, keep: int = 7):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def _new_backup_dir(self) -> Path:
+        name = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = self.directory / f"{name}.partial"
+        path.mkdir(parents=True)
+        return path
+
+    def _discard(self, path: Path) -> None:
+        # Неудачная копия не нужна, иначе .partial-каталоги копятся без ротации
+        shutil.rmtree(path, ignore_errors=True)
+
+    def _finish(self, path: Path, files: list[str], started: float) -> Path:
+        manifest = {
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "duration": round(time.monotonic() - started, 3),
+            "files": sorted(files),
+        }
+        with open(path / MANIFEST_NAME, "w") as f:
+            json.dump(manifest, f, indent=2)
+        # Недописанная копия остается с суффиксом .partial и не считается готовой
+        final_path = path.with_suffix("")
+        path.rename(final_path)
+        self.rotate()
+        logger.info("Резервная копия %s готова за %ss", final_path, manifest["duration"])
+        return final_path
+
+    def list(self) -> list[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(
+            p
+            for p in self.directory.iterdir()
+            if p.suffix != ".partial" and (p / MANIFEST_NAME).exists()
+        )
+
+    def rotate(self) -> None:
+        backups = self.list()
+        for path in backups[: max(0, len(backups) - self.keep)]:
+            shutil.rmtree(path)
+
+    def _link_or_copy(self, source: Path, path: Path, name: str) -> None:
+        # Неизменяемые файлы (закрытые месяцы) не копируются в каждую копию
+        # заново, а связываются жесткой ссылкой с тем же файлом из прошлой
+        stat = source.stat()
+        target = path / name
+        for backup in reversed(self.list()):
+            previous = backup / name
+            try:
+                previous_stat = previous.stat()
+            except FileNotFoundError:
+                continue
+            if (previous_stat.st_size, previous_stat.st_mtime_ns) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                try:
+                    os.link(previous, target)
+                    return
+                except OSError:
+                    break
+        shutil.copy2(source, target)
+
+    def write_snapshot(self, snapshot: dict[str, Any]) -> Path:
+        """
+        Записывает снимок: значение `Path` — неизменяемый файл, он копируется
+        или связывается с прошлой копией; остальное сериализуется в JSON
+        (pydantic-модели через `.dict()`).
+        """
+        started = time.monotonic()
+        path = self._new_backup_dir()
+        try:
+            for name, value in snapshot.items():
+                target = path / name
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if isinstance(value, Path):
+                    self._link_or_copy(value, path, name)
+                else:
+                    with open(target, "w") as f:
+                        json.dump(value, f, indent=2, default=lambda o: o.dict())
+            return self._finish(path, list(snapshot), started)
+        except BaseException:
+            self._discard(path)
+            raise
+
+    def backup_sqlite(self, database: str | Path) -> Path:
+        """
+        Онлайн-копия SQLite через backup API за один шаг. Копия по частям
+        начинается заново после каждой записи из другого соединения и под
+        нагрузкой не заканчивается; в режиме WAL один шаг не мешает писателям.
+        """
+        started = time.monotonic()
+        path = self._new_backup_dir()
+        database = Path(database)
+        try:
+            # Только чтение: по отсутствующему пути не создается пустая база
+            source = sqlite3.connect(f"{database.resolve().as_uri()}?mode=ro", uri=True)
+            target = sqlite3.connect(path / database.name)
+            try:
+                with target:
+                    source.backup(target)
+            finally:
+                target.close()
+                source.close()
+            return self._finish(path, [database.name], started)
+        except BaseException:
+            self._discard(path)
+            raise
+
+
+async def run_periodically(
+    interval: float, job: Callable[[], Awaitable[Any]], name: str
+) -> None:
+    """Запускает `job` каждые `interval` секунд; ошибки логируются, цикл не падает."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await job()
+        except Exception:
+            logger.exception("Ошибка задачи %s", name)
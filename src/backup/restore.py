@@ -0,0 +1,77 @@
+"""
+Восстановление из резервной копии. Приложение должно быть остановлено.
+
+Использование:
+    python -m src.backup.restore <каталог_копии> [целевой_каталог]
+"""
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+from .manager import MANIFEST_NAME
+
+
+SQLITE_SIDECARS = ("-wal", "-shm", "-journal")
+STAGING_DIR = ".restore"
+
+
+def restore(backup_dir: Path, target_dir: Path) -> list[str]:
+    with open(backup_dir / MANIFEST_NAME, "r") as f:
+        files = json.load(f)["files"]
+
+    # Сначала все копируется во временный каталог рядом с данными: если
+    # копирование прервется, живые данные остаются нетронутыми
+    staging = target_dir / STAGING_DIR
+    if staging.exists():
+        shutil.rmtree(staging)
+    try:
+        for name in files:
+            staged = staging / name
+            staged.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(backup_dir / name, staged)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    # Каталоги (например, sales_data/) заменяются целиком переименованием,
+    # чтобы не осталось сегментов, которых не было на момент снимка
+    for entry in sorted(staging.iterdir()):
+        target = target_dir / entry.name
+        if entry.is_dir():
+            old = target.with_name(target.name + ".old")
+            if old.exists():
+                shutil.rmtree(old)
+            if target.exists():
+                target.rename(old)
+            entry.rename(target)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            # Журнал от прежней базы SQLite применился бы к восстановленной
+            for suffix in SQLITE_SIDECARS:
+                target.with_name(target.name + suffix).unlink(missing_ok=True)
+            os.replace(entry, target)
+    staging.rmdir()
+    return files
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Использование: python -m src.backup.restore <каталог_копии> [целевой_каталог]")
+        sys.exit(1)
+
+    backup_dir = Path(sys.argv[1])
+    target_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path(".")
+    try:
+        files = restore(backup_dir, target_dir)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Ошибка: {e}")
+        sys.exit(1)
+
+    for name in files:
+        print(f"  восстановлен {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncSession,
@@ -11,6 +12,18 @@ from config import config
 async_engine: AsyncEngine = create_async_engine(
     url=config.DATABASE_URL, echo=config.DATABASE_ECHO
 )
+
+
+if async_engine.dialect.name == "sqlite":
+    # В WAL читатели не блокируют писателей, и онлайн-копия базы
+    # не останавливает запись
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def set_sqlite_wal(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
 async_session = async_sessionmaker(
     bind=async_engine, autoflush=False, expire_on_commit=False
 )
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Iterable
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(eq=False)
+class Subscription:
+    """Подписка одного клиента на набор топиков с ограниченной очередью."""
+
+    topics: frozenset[str]
+    queue: asyncio.Queue
+    dropped: int = field(default=0)
+
+
+class EventBroker:
+    """
+    Простой in-process брокер событий для SSE.
+
+    Публикация никогда не блокирует: если очередь медленного клиента
+    заполнена, самое старое событие выбрасывается.
+    """
+
+    def __init__(self, max_queue_size: int = 100, heartbeat: float = 15.0):
+        self.max_queue_size = max_queue_size
+        self.heartbeat = heartbeat
+        self._subscribers: dict[str, set[Subscription]] = {}
+
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        subscription = Subscription(
+            topics=frozenset(topics), queue=asyncio.Queue(self.max_queue_size)
+        )
+        for topic in subscription.topics:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[topic]
+
+    def publish(self, topic: str, event: str, data: dict) -> None:
+        message = {"topic": topic, "event": event, "data": data}
+        for subscription in self._subscribers.get(topic, ()):
+            queue = subscription.queue
+            if queue.full():
+                queue.get_nowait()
+                subscription.dropped += 1
+            queue.put_nowait(message)
+
+    def subscriber_count(self) -> int:
+        return len({s for subs in self._subscribers.values() for s in subs})
+
+    async def stream(
+        self, subscription: Subscription, is_disconnected
+    ) -> AsyncGenerator[str, None]:
+        """Генератор SSE-кадров; при простое отправляет heartbeat-комментарии."""
+        try:
+            yield "retry: 3000\n\n"
+            while not await is_disconnected():
+                try:
+                    message = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=self.heartbeat
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                payload = json.dumps(message["data"], ensure_ascii=False)
+                yield f"event: {message['event']}\ndata: {payload}\n\n"
+        finally:
+            self.unsubscribe(subscription)
+            if subscription.dropped:
+                logger.info(
+                    "SSE-клиент отключен, потеряно событий: %s", subscription.dropped
+                )
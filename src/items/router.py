@@ -5,6 +5,7 @@ from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config import config
+from src.assets.staticfiles import AssetManifest
 from .dao import ItemDAO
 from .schemas import ItemSchema
 from src.database.session import get_session
@@ -12,6 +13,7 @@ from src.database.session import get_session
 
 router: APIRouter = APIRouter(prefix="/items", tags=["item"])
 templates = Jinja2Templates(directory=str(config.TEMPLATES_DIR))
+templates.env.globals["asset_url"] = AssetManifest(config.STATIC_DIR).url
 
 
 async def get_dao(session: AsyncSession = Depends(get_session)) -> ItemDAO:
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger(__name__)
+
+# Ответы больше этого размера не кэшируются для отдачи под нагрузкой
+MAX_STALE_BODY = 1024 * 1024
+
+
+@dataclass
+class RouteLimit:
+    """Ограничения для одного маршрута."""
+
+    max_concurrency: int = 4
+    max_queue: int = 16
+    timeout: float = 2.0
+    retry_after: int = 1
+    serve_stale: bool = True
+    # Старше этого (в секундах) копия под нагрузкой не отдается
+    stale_max_age: float = 60.0
+
+
+@dataclass
+class RouteGate:
+    limit: RouteLimit
+    semaphore: asyncio.Semaphore
+    active: int = 0
+    waiting: int = 0
+    admitted: int = 0
+    shed: int = 0
+    timeouts: int = 0
+    served_stale: int = 0
+    stale: OrderedDict = field(default_factory=OrderedDict)
+
+
+class AdmissionController:
+    """
+    Ограничение конкурентности тяжелых маршрутов.
+
+    На каждый маршрут — семафор и ограниченная очередь ожидания. Если
+    очередь полна или ожидание превысило таймаут, запрос сразу получает
+    устаревшую копию последнего успешного ответа не старше `stale_max_age`,
+    а если ее нет — 503 с Retry-After.
+    """
+
+    def __init__(self, limits: dict[str, RouteLimit], stale_cache_size: int = 64):
+        self.stale_cache_size = stale_cache_size
+        self.gates = {
+            self._normalize(path): RouteGate(
+                limit=limit, semaphore=asyncio.Semaphore(limit.max_concurrency)
+            )
+            for path, limit in limits.items()
+        }
+
+    @staticmethod
+    def _normalize(path: str) -> str:
+        return path.rstrip("/") or "/"
+
+    def gate_for(self, path: str) -> RouteGate | None:
+        return self.gates.get(self._normalize(path))
+
+    def snapshot(self) -> dict[str, dict]:
+        return {
+            path: {
+                "active": gate.active,
+                "queue_depth": gate.waiting,
+                "max_concurrency": gate.limit.max_concurrency,
+                "max_queue": gate.limit.max_queue,
+                "admitted": gate.admitted,
+                "shed": gate.shed,
+                "timeouts": gate.timeouts,
+                "served_stale": gate.served_stale,
+            }
+            for path, gate in self.gates.items()
+        }
+
+    async def acquire(self, gate: RouteGate) -> bool:
+        if not gate.semaphore.locked():
+            await gate.semaphore.acquire()
+            return True
+
+        if gate.waiting >= gate.limit.max_queue:
+            gate.shed += 1
+            return False
+
+        gate.waiting += 1
+        try:
+            await asyncio.wait_for(gate.semaphore.acquire(), gate.limit.timeout)
+            return True
+        except asyncio.TimeoutError:
+            gate.timeouts += 1
+            gate.shed += 1
+            return False
+        finally:
+            gate.waiting -= 1
+
+
+def _stale_key(scope: Scope) -> tuple:
+    # Cookie входит в ключ, чтобы не отдать чужую страницу другому пользователю,
+    # Accept-Encoding — чтобы не отдать сжатый ответ клиенту без поддержки сжатия
+    headers = dict(scope["headers"])
+    return (
+        scope["path"],
+        scope["query_string"],
+        headers.get(b"cookie", b""),
+        headers.get(b"accept-encoding", b""),
+    )
+
+
+class AdmissionMiddleware:
+    def __init__(self, app: ASGIApp, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.controller.gate_for(scope["path"])
+        if gate is None:
+            await self.app(scope, receive, send)
+            return
+
+        cacheable = gate.limit.serve_stale and scope["method"] == "GET"
+        if not await self.controller.acquire(gate):
+            await self._reject(gate, scope, send, cacheable)
+            return
+
+        gate.active += 1
+        gate.admitted += 1
+        try:
+            if cacheable:
+                await self._call_and_remember(gate, scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            gate.active -= 1
+            gate.semaphore.release()
+
+    async def _call_and_remember(
+        self, gate: RouteGate, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        start: Message | None = None
+        chunks: list[bytes] = []
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, size
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body" and start is not None:
+                size += len(message.get("body", b""))
+                if size <= MAX_STALE_BODY:
+                    chunks.append(message.get("body", b""))
+                if not message.get("more_body", False) and size <= MAX_STALE_BODY:
+                    self._remember(gate, scope, start, b"".join(chunks))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _remember(
+        self, gate: RouteGate, scope: Scope, start: Message, body: bytes
+    ) -> None:
+        headers = start.get("headers", [])
+        if start["status"] != 200 or any(k.lower() == b"set-cookie" for k, _ in headers):
+            return
+        key = _stale_key(scope)
+        gate.stale[key] = (time.monotonic(), headers, body)
+        gate.stale.move_to_end(key)
+        while len(gate.stale) > self.controller.stale_cache_size:
+            gate.stale.popitem(last=False)
+
+    async def _reject(
+        self, gate: RouteGate, scope: Scope, send: Send, cacheable: bool
+    ) -> None:
+        key = _stale_key(scope)
+        cached = gate.stale.get(key) if cacheable else None
+        if cached is not None:
+            stored_at, headers, body = cached
+            age = time.monotonic() - stored_at
+            if age > gate.limit.stale_max_age:
+                del gate.stale[key]
+                cached = None
+        if cached is not None:
+            gate.served_stale += 1
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": list(headers)
+                    + [(b"age", str(int(age)).encode()), (b"x-served-stale", b"1")],
+                }
+            )
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        logger.warning("Запрос к %s отклонен: маршрут перегружен", scope["path"])
+        body = b"Service overloaded"
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"text/plain; charset=utf-8"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(gate.limit.retry_after).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
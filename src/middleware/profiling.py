@@ -0,0 +1,253 @@
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterator
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_NAME = re.compile(r"^[0-9]+-[0-9a-f]{8}$")
+SUMMARY_LINES = 40
+STREAMING_CONTENT_TYPE = b"text/event-stream"
+
+
+class RequestTimings:
+    """Время по секциям (шаблоны, сохранение, БД) в рамках одного запроса."""
+
+    def __init__(self):
+        self.sections: dict[str, dict] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        section = self.sections.setdefault(name, {"count": 0, "seconds": 0.0})
+        section["count"] += 1
+        section["seconds"] += seconds
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Учитывает время блока, если текущий запрос профилируется."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started)
+
+
+def instrument_templates(templates) -> None:
+    """Оборачивает `Jinja2Templates.TemplateResponse`, рендер идет внутри вызова."""
+    template_response = templates.TemplateResponse
+
+    def timed_template_response(*args, **kwargs):
+        with timed("template"):
+            return template_response(*args, **kwargs)
+
+    templates.TemplateResponse = timed_template_response
+
+
+def instrument_engine(sync_engine) -> None:
+    """Учитывает время SQL-запросов через события SQLAlchemy."""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._profiling_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        timings = _current.get()
+        if timings is not None:
+            timings.add("db", time.perf_counter() - context._profiling_started)
+
+
+@dataclass
+class ProfilerSettings:
+    # Доля запросов, профилируемых cProfile без явного запроса
+    sample_rate: float = 0.0
+    # Запросы дольше порога сохраняются с таймингами (и профилем, если он был)
+    slow_threshold: float = 0.0
+    header: str = "x-profile"
+    query_param: str = "profile"
+
+
+class ProfileStore:
+    """Кольцевой буфер захватов на диске: `<name>.json` и `<name>.prof`."""
+
+    def __init__(self, directory: str | Path, max_entries: int = 50):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+
+    def save(self, meta: dict, profiler: cProfile.Profile | None) -> str:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        meta = dict(meta, name=name, has_profile=profiler is not None)
+
+        if profiler is not None:
+            profiler.dump_stats(self.directory / f"{name}.prof")
+            summary = io.StringIO()
+            stats = pstats.Stats(profiler, stream=summary)
+            stats.sort_stats("cumulative").print_stats(SUMMARY_LINES)
+            meta["summary"] = summary.getvalue()
+
+        with open(self.directory / f"{name}.json", "w") as f:
+            json.dump(meta, f, indent=2)
+        self._rotate()
+        return name
+
+    def _rotate(self) -> None:
+        captures = sorted(self.directory.glob("*.json"))
+        for path in captures[: max(0, len(captures) - self.max_entries)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".prof").unlink(missing_ok=True)
+
+    def list(self) -> list[dict]:
+        result = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True):
+            with open(path, "r") as f:
+                meta = json.load(f)
+            meta.pop("summary", None)
+            result.append(meta)
+        return result
+
+    def path_for(self, name: str, suffix: str = ".prof") -> Path | None:
+        if not CAPTURE_NAME.match(name):
+            return None
+        path = self.directory / f"{name}{suffix}"
+        return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельных запросов по требованию.
+
+    Запрос профилируется cProfile, если администратор передал заголовок
+    `x-profile: 1` или `?profile=1` (проверяется через `authorize`), либо
+    если он попал в выборку `sample_rate`. Если задан `slow_threshold`,
+    тайминги шаблонов и сохранения собираются для каждого запроса, а
+    медленные сохраняются даже без профиля.
+
+    cProfile видит весь поток, поэтому в профиль попадают и запросы,
+    выполнявшиеся в event loop одновременно с профилируемым.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        settings: ProfilerSettings,
+        authorize: Callable[[Scope], bool],
+    ):
+        self.app = app
+        self.store = store
+        self.settings = settings
+        self.authorize = authorize
+        self._profiling = False
+
+    def _requested(self, scope: Scope) -> bool:
+        headers = dict(scope["headers"])
+        flag = headers.get(self.settings.header.encode(), b"").decode()
+        if not flag:
+            query = parse_qs(scope["query_string"].decode())
+            flag = query.get(self.settings.query_param, [""])[0]
+        return flag in ("1", "true") and self.authorize(scope)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if self._requested(scope):
+            trigger = "request"
+        elif random.random() < self.settings.sample_rate:
+            trigger = "sample"
+        elif self.settings.slow_threshold > 0:
+            trigger = "threshold"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        # Одновременно может работать только один профайлер
+        profiler = None
+        if trigger != "threshold" and not self._profiling:
+            profiler = cProfile.Profile()
+            self._profiling = True
+
+        timings = RequestTimings()
+        token = _current.set(timings)
+        status_code = 500
+        streaming = False
+        error = None
+        cancelled = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, streaming
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"")
+                streaming = content_type.startswith(STREAMING_CONTENT_TYPE)
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_wrapper)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except Exception as e:
+            # Запрос упал: сохраняем захват как 500 и пробрасываем ошибку дальше
+            status_code = 500
+            error = repr(e)
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+            duration = time.perf_counter() - started
+            _current.reset(token)
+
+            # SSE-соединения живут долго и вытеснили бы из буфера настоящие
+            # медленные запросы, поэтому сохраняем их только по явному запросу
+            slow = duration >= self.settings.slow_threshold
+            keep = trigger == "request" or (
+                not streaming and (trigger == "sample" or slow)
+            )
+            if keep and not cancelled:
+                meta = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope["query_string"].decode(),
+                    "status": status_code,
+                    "trigger": trigger,
+                    "duration": round(duration, 6),
+                    "timings": timings.sections,
+                    "error": error,
+                }
+                await self._save(meta, profiler, scope["path"])
+
+    async def _save(self, meta: dict, profiler: cProfile.Profile | None, path: str):
+        try:
+            await asyncio.to_thread(self.store.save, meta, profiler)
+        except OSError:
+            logger.exception("Не удалось сохранить профиль запроса %s", path)
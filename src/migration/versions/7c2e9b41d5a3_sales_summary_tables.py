@@ -0,0 +1,126 @@
+"""Sales and summary tables maintained by triggers
+
+Revision ID: 7c2e9b41d5a3
+Revises: 418a0dd90a7a
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2e9b41d5a3'
+down_revision: Union[str, None] = '418a0dd90a7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Добавление продажи в сводные таблицы
+ADD_SALE_SQL = """
+    INSERT INTO daily_sales_summary (day, sales_count, items_sold, revenue)
+    VALUES (date({row}.sold_at), 1, {row}.quantity, {row}.amount)
+    ON CONFLICT(day) DO UPDATE SET
+        sales_count = sales_count + 1,
+        items_sold = items_sold + excluded.items_sold,
+        revenue = revenue + excluded.revenue;
+
+    INSERT INTO item_sales_summary (item_id, sales_count, items_sold, revenue, last_sold_at)
+    VALUES ({row}.item_id, 1, {row}.quantity, {row}.amount, {row}.sold_at)
+    ON CONFLICT(item_id) DO UPDATE SET
+        sales_count = sales_count + 1,
+        items_sold = items_sold + excluded.items_sold,
+        revenue = revenue + excluded.revenue,
+        last_sold_at = max(coalesce(last_sold_at, excluded.last_sold_at), excluded.last_sold_at);
+"""
+
+# Вычитание продажи из сводных таблиц, пустые строки удаляются
+REMOVE_SALE_SQL = """
+    UPDATE daily_sales_summary SET
+        sales_count = sales_count - 1,
+        items_sold = items_sold - {row}.quantity,
+        revenue = revenue - {row}.amount
+    WHERE day = date({row}.sold_at);
+
+    DELETE FROM daily_sales_summary
+    WHERE day = date({row}.sold_at) AND sales_count <= 0;
+
+    UPDATE item_sales_summary SET
+        sales_count = sales_count - 1,
+        items_sold = items_sold - {row}.quantity,
+        revenue = revenue - {row}.amount,
+        last_sold_at = (SELECT max(sold_at) FROM sales WHERE item_id = {row}.item_id)
+    WHERE item_id = {row}.item_id;
+
+    DELETE FROM item_sales_summary
+    WHERE item_id = {row}.item_id AND sales_count <= 0;
+"""
+
+TRIGGERS = {
+    "sales_after_insert": "AFTER INSERT ON sales BEGIN {add} END",
+    "sales_after_delete": "AFTER DELETE ON sales BEGIN {remove} END",
+    "sales_after_update": (
+        "AFTER UPDATE OF item_id, quantity, amount, sold_at ON sales "
+        "BEGIN {remove} {add} END"
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sales',
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('sold_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['items.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sales_item_id'), 'sales', ['item_id'], unique=False)
+    op.create_index(op.f('ix_sales_sold_at'), 'sales', ['sold_at'], unique=False)
+
+    op.create_table('daily_sales_summary',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('items_sold', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day')
+    )
+
+    op.create_table('item_sales_summary',
+    sa.Column('item_id', sa.Integer(), nullable=False),
+    sa.Column('sales_count', sa.Integer(), nullable=False),
+    sa.Column('items_sold', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('last_sold_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.ForeignKeyConstraint(['item_id'], ['items.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('item_id')
+    )
+    op.create_index(op.f('ix_item_sales_summary_items_sold'), 'item_sales_summary', ['items_sold'], unique=False)
+
+    add_new = ADD_SALE_SQL.format(row="NEW")
+    remove_old = REMOVE_SALE_SQL.format(row="OLD")
+    for name, body in TRIGGERS.items():
+        op.execute(f"CREATE TRIGGER {name} " + body.format(add=add_new, remove=remove_old))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.drop_index(op.f('ix_item_sales_summary_items_sold'), table_name='item_sales_summary')
+    op.drop_table('item_sales_summary')
+    op.drop_table('daily_sales_summary')
+    op.drop_index(op.f('ix_sales_sold_at'), table_name='sales')
+    op.drop_index(op.f('ix_sales_item_id'), table_name='sales')
+    op.drop_table('sales')
@@ -0,0 +1,45 @@
+from datetime import date
+
+from sqlalchemy import select
+
+from src.database.base_dao import BaseDAO
+from .model import Sale, DailySalesSummary, ItemSalesSummary
+
+
+class SaleDAO(BaseDAO):
+    """
+    Продажи. Методы `*_summary` читают сводные таблицы, которые ведут
+    триггеры SQLite, поэтому не зависят от объема истории продаж.
+    """
+
+    model = Sale
+
+    async def get_day_summary(self, day: date) -> DailySalesSummary | None:
+        result = await self.session.execute(
+            select(DailySalesSummary).where(DailySalesSummary.day == day)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_daily_summary(
+        self, date_from: date, date_to: date
+    ) -> list[DailySalesSummary]:
+        result = await self.session.execute(
+            select(DailySalesSummary)
+            .where(DailySalesSummary.day.between(date_from, date_to))
+            .order_by(DailySalesSummary.day)
+        )
+        return result.scalars().all()
+
+    async def get_item_summary(self, item_id: int) -> ItemSalesSummary | None:
+        result = await self.session.execute(
+            select(ItemSalesSummary).where(ItemSalesSummary.item_id == item_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_top_items(self, limit: int = 5) -> list[ItemSalesSummary]:
+        result = await self.session.execute(
+            select(ItemSalesSummary)
+            .order_by(ItemSalesSummary.items_sold.desc())
+            .limit(limit)
+        )
+        return result.scalars().all()
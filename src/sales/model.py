@@ -0,0 +1,42 @@
+from datetime import date, datetime
+
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Integer, Float, Date, ForeignKey, func
+
+from src.database.base import Base
+
+
+class Sale(Base):
+    __tablename__ = "sales"
+
+    item_id: Mapped[int] = mapped_column(ForeignKey("items.id"), index=True)
+    quantity: Mapped[int] = mapped_column(Integer)
+    # Сумма строки продажи (quantity * цена за единицу), а не цена за единицу
+    amount: Mapped[float] = mapped_column(Float)
+    sold_at: Mapped[datetime] = mapped_column(server_default=func.now(), index=True)
+
+    def __repr__(self) -> str:
+        return f"Sale(id={self.id!r}, item_id={self.item_id!r}, quantity={self.quantity!r})"
+
+
+class DailySalesSummary(Base):
+    """Итоги продаж за день, поддерживаются триггерами на таблице sales."""
+
+    __tablename__ = "daily_sales_summary"
+
+    day: Mapped[date] = mapped_column(Date, unique=True)
+    sales_count: Mapped[int] = mapped_column(Integer, default=0)
+    items_sold: Mapped[int] = mapped_column(Integer, default=0)
+    revenue: Mapped[float] = mapped_column(Float, default=0)
+
+
+class ItemSalesSummary(Base):
+    """Итоги продаж по товару, поддерживаются триггерами на таблице sales."""
+
+    __tablename__ = "item_sales_summary"
+
+    item_id: Mapped[int] = mapped_column(ForeignKey("items.id"), unique=True)
+    sales_count: Mapped[int] = mapped_column(Integer, default=0)
+    items_sold: Mapped[int] = mapped_column(Integer, default=0, index=True)
+    revenue: Mapped[float] = mapped_column(Float, default=0)
+    last_sold_at: Mapped[datetime | None]
@@ -0,0 +1,24 @@
+from datetime import date, datetime
+
+from pydantic import BaseModel
+
+
+class SaleSchema(BaseModel):
+    item_id: int
+    quantity: int
+    amount: float
+
+
+class DailySalesSummarySchema(BaseModel):
+    day: date
+    sales_count: int
+    items_sold: int
+    revenue: float
+
+
+class ItemSalesSummarySchema(BaseModel):
+    item_id: int
+    sales_count: int
+    items_sold: int
+    revenue: float
+    last_sold_at: datetime | None
@@ -0,0 +1,153 @@
+import asyncio
+
+from src.middleware.admission import AdmissionController, AdmissionMiddleware, RouteLimit
+
+
+class SlowApp:
+    """Отвечает 200, пока `open` установлен; иначе ждет его."""
+
+    def __init__(self, headers=()):
+        self.open = asyncio.Event()
+        self.open.set()
+        self.headers = list(headers)
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        await self.open.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": self.headers})
+        await send({"type": "http.response.body", "body": f"page {self.calls}".encode()})
+
+
+def make_middleware(app, **limit):
+    controller = AdmissionController({"/statistics": RouteLimit(**limit)})
+    return AdmissionMiddleware(app, controller), controller
+
+
+async def request(middleware, headers=(), method="GET"):
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/statistics",
+        "query_string": b"",
+        "headers": list(headers),
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, receive, send)
+    start, body = messages[0], b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], dict(start["headers"]), body
+
+
+def test_full_queue_is_shed_immediately():
+    async def run():
+        app = SlowApp()
+        middleware, controller = make_middleware(app, max_concurrency=1, max_queue=1, timeout=5)
+        app.open.clear()
+        running = asyncio.create_task(request(middleware))
+        queued = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0.01)
+        assert controller.snapshot()["/statistics"]["queue_depth"] == 1
+
+        status, headers, _ = await request(middleware)
+        assert status == 503
+        assert headers[b"retry-after"] == b"1"
+
+        app.open.set()
+        assert [r[0] for r in await asyncio.gather(running, queued)] == [200, 200]
+        stats = controller.snapshot()["/statistics"]
+        assert (stats["admitted"], stats["shed"], stats["active"]) == (2, 1, 0)
+
+    asyncio.run(run())
+
+
+def test_wait_longer_than_timeout_is_shed():
+    async def run():
+        app = SlowApp()
+        middleware, controller = make_middleware(app, max_concurrency=1, max_queue=4, timeout=0.05)
+        app.open.clear()
+        running = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0.01)
+
+        status, _, _ = await request(middleware)
+        assert status == 503
+        assert controller.snapshot()["/statistics"]["timeouts"] == 1
+        assert controller.snapshot()["/statistics"]["queue_depth"] == 0
+
+        app.open.set()
+        await running
+
+    asyncio.run(run())
+
+
+def test_stale_copy_is_keyed_by_cookie_and_encoding():
+    async def run():
+        app = SlowApp()
+        middleware, controller = make_middleware(app, max_concurrency=1, max_queue=0)
+        alice = [(b"cookie", b"session=alice"), (b"accept-encoding", b"gzip")]
+        assert (await request(middleware, alice))[0] == 200
+
+        app.open.clear()
+        running = asyncio.create_task(request(middleware, alice))
+        await asyncio.sleep(0.01)
+
+        status, headers, body = await request(middleware, alice)
+        assert (status, body) == (200, b"page 1")
+        assert headers[b"x-served-stale"] == b"1"
+        bob = [(b"cookie", b"session=bob"), (b"accept-encoding", b"gzip")]
+        assert (await request(middleware, bob))[0] == 503
+        assert (await request(middleware, alice[:1]))[0] == 503
+        assert (await request(middleware, alice, method="POST"))[0] == 503
+        assert controller.snapshot()["/statistics"]["served_stale"] == 1
+
+        app.open.set()
+        await running
+
+    asyncio.run(run())
+
+
+def test_responses_setting_cookies_are_not_cached():
+    async def run():
+        app = SlowApp(headers=[(b"set-cookie", b"location=north")])
+        middleware, _ = make_middleware(app, max_concurrency=1, max_queue=0)
+        assert (await request(middleware))[0] == 200
+
+        app.open.clear()
+        running = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0.01)
+        assert (await request(middleware))[0] == 503
+
+        app.open.set()
+        await running
+
+    asyncio.run(run())
+
+
+def test_stale_copy_expires():
+    async def run():
+        app = SlowApp()
+        middleware, controller = make_middleware(
+            app, max_concurrency=1, max_queue=0, stale_max_age=0.05
+        )
+        assert (await request(middleware))[0] == 200
+
+        app.open.clear()
+        running = asyncio.create_task(request(middleware))
+        await asyncio.sleep(0.01)
+        status, headers, _ = await request(middleware)
+        assert (status, headers[b"age"]) == (200, b"0")
+
+        await asyncio.sleep(0.06)
+        assert (await request(middleware))[0] == 503
+        assert not controller.gates["/statistics"].stale
+
+        app.open.set()
+        await running
+
+    asyncio.run(run())
@@ -0,0 +1,46 @@
+from src.assets.build import DIST_DIR, KEEP_BUILDS, build
+from src.assets.staticfiles import AssetManifest
+
+
+def write_css(static_dir, version: int) -> None:
+    (static_dir / "css").mkdir(parents=True, exist_ok=True)
+    (static_dir / "css" / "styles.css").write_text(f"body {{ --v: {version}; }}" + " " * 300)
+
+
+def test_rebuild_keeps_files_of_previous_builds(tmp_path):
+    write_css(tmp_path, 0)
+    first = build(tmp_path)["css/styles.css"]
+    write_css(tmp_path, 1)
+    second = build(tmp_path)["css/styles.css"]
+
+    assert first != second
+    assert (tmp_path / first).exists()
+    assert (tmp_path / f"{first}.gz").exists()
+    assert (tmp_path / second).exists()
+
+
+def test_files_older_than_kept_builds_are_pruned(tmp_path):
+    paths = []
+    for version in range(KEEP_BUILDS + 1):
+        write_css(tmp_path, version)
+        paths.append(build(tmp_path)["css/styles.css"])
+
+    assert not (tmp_path / paths[0]).exists()
+    assert not (tmp_path / f"{paths[0]}.gz").exists()
+    assert all((tmp_path / path).exists() for path in paths[1:])
+    # Повторная сборка без изменений не вытесняет прошлые
+    build(tmp_path)
+    assert (tmp_path / paths[1]).exists()
+
+
+def test_manifest_is_reloaded_after_rebuild(tmp_path):
+    write_css(tmp_path, 0)
+    build(tmp_path)
+    manifest = AssetManifest(tmp_path, check_interval=0)
+    first = manifest.url("css/styles.css")
+    assert first.startswith(f"/static/{DIST_DIR}/css/styles.")
+
+    write_css(tmp_path, 1)
+    second = build(tmp_path)["css/styles.css"]
+    assert manifest.url("css/styles.css") == f"/static/{second}"
+    assert manifest.url("missing.js") == "/static/missing.js"
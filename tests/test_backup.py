@@ -0,0 +1,137 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.backup.manager import BackupManager
+from src.backup.restore import restore
+
+
+def test_failed_snapshot_leaves_no_partial(tmp_path):
+    backups = BackupManager(tmp_path / "backups")
+    with pytest.raises(OSError):
+        backups.write_snapshot({"items.json": [], "missing.json": tmp_path / "missing.json"})
+    assert list((tmp_path / "backups").iterdir()) == []
+
+
+def test_failed_sqlite_backup_leaves_no_partial(tmp_path):
+    backups = BackupManager(tmp_path / "backups")
+    with pytest.raises(sqlite3.Error):
+        backups.backup_sqlite(tmp_path / "missing" / "seven.db")
+    assert list((tmp_path / "backups").iterdir()) == []
+
+
+def test_restore_removes_stale_sqlite_journal(tmp_path):
+    database = tmp_path / "seven.db"
+    with sqlite3.connect(database) as connection:
+        connection.execute("create table items (name text)")
+    connection.close()
+    backup = BackupManager(tmp_path / "backups").backup_sqlite(database)
+
+    target = tmp_path / "restored"
+    target.mkdir()
+    for suffix in ("-wal", "-shm", "-journal"):
+        Path(f"{target / 'seven.db'}{suffix}").write_bytes(b"stale")
+
+    assert restore(backup, target) == ["seven.db"]
+    assert sorted(p.name for p in target.iterdir()) == ["seven.db"]
+
+
+def test_sqlite_backup_does_not_create_missing_database(tmp_path):
+    backups = BackupManager(tmp_path / "backups")
+    with pytest.raises(sqlite3.Error):
+        backups.backup_sqlite(tmp_path / "seven.db")
+    assert not (tmp_path / "seven.db").exists()
+
+
+def test_sqlite_backup_finishes_under_concurrent_writes(tmp_path):
+    database = tmp_path / "seven.db"
+    connection = sqlite3.connect(database)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("create table sales (id integer primary key, note text)")
+    with connection:
+        connection.executemany(
+            "insert into sales (note) values (?)", [("x" * 200,) for _ in range(20000)]
+        )
+    connection.close()
+
+    stop = threading.Event()
+
+    def writer():
+        with sqlite3.connect(database) as writer_connection:
+            while not stop.is_set():
+                with writer_connection:
+                    writer_connection.execute("insert into sales (note) values ('w')")
+                time.sleep(0.005)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        started = time.monotonic()
+        backup = BackupManager(tmp_path / "backups").backup_sqlite(database)
+        assert time.monotonic() - started < 5
+    finally:
+        stop.set()
+        thread.join()
+
+    with sqlite3.connect(backup / "seven.db") as copy:
+        assert copy.execute("select count(*) from sales").fetchone()[0] >= 20000
+
+
+def test_snapshot_links_unchanged_files_to_previous_backup(tmp_path):
+    segment = tmp_path / "2020-01.json.gz"
+    segment.write_bytes(b"sealed")
+    backups = BackupManager(tmp_path / "backups")
+
+    first = backups.write_snapshot({"sales_data/2020-01.json.gz": segment, "items.json": []})
+    second = backups.write_snapshot({"sales_data/2020-01.json.gz": segment, "items.json": []})
+    assert (first / "sales_data/2020-01.json.gz").stat().st_ino == (
+        second / "sales_data/2020-01.json.gz"
+    ).stat().st_ino
+
+    segment.write_bytes(b"changed")
+    third = backups.write_snapshot({"sales_data/2020-01.json.gz": segment})
+    assert (third / "sales_data/2020-01.json.gz").read_bytes() == b"changed"
+    assert (first / "sales_data/2020-01.json.gz").read_bytes() == b"sealed"
+
+
+def make_live_data(target):
+    (target / "sales_data").mkdir(parents=True)
+    (target / "sales_data" / "2020-01.json.gz").write_bytes(b"live")
+    (target / "sales_data" / "2099-01.json").write_bytes(b"after snapshot")
+    (target / "items.json").write_text("live")
+
+
+def test_restore_replaces_directories_wholesale(tmp_path):
+    target = tmp_path / "live"
+    make_live_data(target)
+    segment = tmp_path / "segment"
+    segment.write_bytes(b"backup")
+    backup = BackupManager(tmp_path / "backups").write_snapshot(
+        {"sales_data/2020-01.json.gz": segment, "items.json": ["item"]}
+    )
+
+    restore(backup, target)
+    assert sorted(p.name for p in (target / "sales_data").iterdir()) == ["2020-01.json.gz"]
+    assert (target / "sales_data" / "2020-01.json.gz").read_bytes() == b"backup"
+    assert sorted(p.name for p in target.iterdir()) == ["items.json", "sales_data"]
+
+
+def test_failed_restore_keeps_live_data(tmp_path):
+    target = tmp_path / "live"
+    make_live_data(target)
+    segment = tmp_path / "segment"
+    segment.write_bytes(b"backup")
+    backup = BackupManager(tmp_path / "backups").write_snapshot(
+        {"sales_data/2020-01.json.gz": segment, "items.json": []}
+    )
+    # Усеченная копия: одного из файлов манифеста нет
+    (backup / "items.json").unlink()
+
+    with pytest.raises(OSError):
+        restore(backup, target)
+    assert (target / "sales_data" / "2020-01.json.gz").read_bytes() == b"live"
+    assert (target / "items.json").read_text() == "live"
+    assert sorted(p.name for p in target.iterdir()) == ["items.json", "sales_data"]
@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+from src.events.broker import EventBroker
+
+
+def test_publish_goes_only_to_subscribed_topics():
+    async def run():
+        broker = EventBroker()
+        items = broker.subscribe(["main:items"])
+        both = broker.subscribe(["main:items", "main:sales"])
+        other = broker.subscribe(["north:items"])
+
+        broker.publish("main:items", "item.updated", {"id": "1"})
+        broker.publish("main:sales", "sale.created", {"id": "2"})
+
+        assert items.queue.qsize() == 1
+        assert [both.queue.get_nowait()["event"] for _ in range(2)] == [
+            "item.updated",
+            "sale.created",
+        ]
+        assert other.queue.empty()
+
+    asyncio.run(run())
+
+
+def test_full_queue_drops_oldest_event():
+    async def run():
+        broker = EventBroker(max_queue_size=2)
+        subscription = broker.subscribe(["main:sales"])
+        for number in range(5):
+            broker.publish("main:sales", "sale.created", {"number": number})
+
+        assert subscription.dropped == 3
+        assert [subscription.queue.get_nowait()["data"]["number"] for _ in range(2)] == [3, 4]
+
+    asyncio.run(run())
+
+
+def test_stream_unsubscribes_on_disconnect():
+    async def run():
+        broker = EventBroker()
+        subscription = broker.subscribe(["main:items", "main:sales"])
+        broker.publish("main:items", "item.deleted", {"id": "1"})
+        disconnected = False
+
+        async def is_disconnected():
+            return disconnected
+
+        frames = []
+        async for frame in broker.stream(subscription, is_disconnected):
+            frames.append(frame)
+            if frame.startswith("event:"):
+                disconnected = True
+
+        assert frames == [
+            "retry: 3000\n\n",
+            f"event: item.deleted\ndata: {json.dumps({'id': '1'})}\n\n",
+        ]
+        assert broker.subscriber_count() == 0
+        # Публикация после отключения никого не ждет
+        broker.publish("main:items", "item.deleted", {"id": "2"})
+        assert subscription.queue.empty()
+
+    asyncio.run(run())
+
+
+def test_stream_sends_heartbeat_when_idle():
+    async def run():
+        broker = EventBroker(heartbeat=0.01)
+        subscription = broker.subscribe(["main:items"])
+
+        async def is_disconnected():
+            return False
+
+        stream = broker.stream(subscription, is_disconnected)
+        assert await anext(stream) == "retry: 3000\n\n"
+        assert await anext(stream) == ": ping\n\n"
+        await stream.aclose()
+        assert broker.subscriber_count() == 0
+
+    asyncio.run(run())
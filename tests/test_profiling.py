@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from src.middleware.profiling import ProfilerSettings, ProfileStore, ProfilingMiddleware
+
+
+def make_scope(path: str) -> dict:
+    return {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def send(message):
+    pass
+
+
+def run(app, path: str, tmp_path) -> ProfileStore:
+    store = ProfileStore(tmp_path / "profiles")
+    middleware = ProfilingMiddleware(
+        app, store, ProfilerSettings(slow_threshold=0.01), authorize=lambda scope: False
+    )
+    asyncio.run(middleware(make_scope(path), receive, send))
+    return store
+
+
+def test_slow_request_is_saved(tmp_path):
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.02)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    captures = run(app, "/statistics", tmp_path).list()
+    assert [(c["path"], c["status"], c["trigger"]) for c in captures] == [
+        ("/statistics", 200, "threshold")
+    ]
+
+
+def test_event_stream_is_not_saved(tmp_path):
+    async def app(scope, receive, send):
+        headers = [(b"content-type", b"text/event-stream; charset=utf-8")]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await asyncio.sleep(0.02)
+        await send({"type": "http.response.body", "body": b""})
+
+    assert run(app, "/events", tmp_path).list() == []
+
+
+def test_failed_request_is_saved_and_reraised(tmp_path):
+    async def app(scope, receive, send):
+        await asyncio.sleep(0.02)
+        raise ValueError("boom")
+
+    store = ProfileStore(tmp_path / "profiles")
+    middleware = ProfilingMiddleware(
+        app, store, ProfilerSettings(slow_threshold=0.01), authorize=lambda scope: False
+    )
+    with pytest.raises(ValueError):
+        asyncio.run(middleware(make_scope("/statistics"), receive, send))
+    [capture] = store.list()
+    assert capture["status"] == 500
+    assert "boom" in capture["error"]
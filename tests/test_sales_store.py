@@ -0,0 +1,278 @@
+import json
+import random
+import shutil
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from pydantic import BaseModel
+
+import sales_store
+from sales_store import (
+    ITEMS_DIR,
+    LEGACY_IDS_FILE,
+    ItemSalesHistory,
+    SalesStore,
+    new_sale_id,
+)
+
+
+class Sale(BaseModel):
+    id: str
+    item_id: str
+    item_name: str
+    quantity_sold: int
+    sale_price: float
+    sale_date: str
+
+
+THIS_MONTH = datetime.now().strftime("%Y-%m")
+# Месяцы далеко за горячим окном, при запуске они закрываются
+OLD_MONTHS = ["2020-01", "2020-02"]
+
+
+def make_sale(sale_date: str, item_id: str = "item-1", quantity: int = 1, sale_id=None):
+    return Sale(
+        id=sale_id or new_sale_id(sale_date),
+        item_id=item_id,
+        item_name=item_id,
+        quantity_sold=quantity,
+        sale_price=10.0 * quantity,
+        sale_date=sale_date,
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    directory = tmp_path / "sales"
+    directory.mkdir()
+    # Два дня в каждом старом месяце и три продажи в текущем
+    for month in OLD_MONTHS:
+        sales = [make_sale(f"{month}-0{day} 10:00:00") for day in (1, 1, 2)]
+        with open(directory / f"{month}.json", "w") as f:
+            json.dump([sale.model_dump() for sale in sales], f)
+    store = SalesStore(directory, Sale)
+    for day in (1, 2, 2):
+        store.add(make_sale(f"{THIS_MONTH}-0{day} 12:00:00"))
+    return store
+
+
+def test_old_months_are_sealed(store):
+    assert set(OLD_MONTHS) <= set(store.sealed_totals)
+    assert not set(OLD_MONTHS) & set(store.hot)
+    assert (store.directory / "2020-01.json.gz").exists()
+    assert not (store.directory / "2020-01.json").exists()
+
+
+@pytest.mark.parametrize(
+    "prefix, expected",
+    [
+        ("", 9),
+        ("2020", 6),
+        ("2020-01", 3),
+        ("2020-01-01", 2),
+        ("2020-01-01 10", 2),
+        (THIS_MONTH, 3),
+        (f"{THIS_MONTH}-02", 2),
+        ("2019", 0),
+    ],
+)
+def test_count_and_slice_match_full_scan(store, prefix, expected):
+    everything = [s for s in store.iter_sales() if s.sale_date.startswith(prefix)]
+    assert store.count(prefix) == expected == len(everything)
+    for start in range(expected + 1):
+        for end in range(start, expected + 2):
+            page = store.slice(prefix, start, end)
+            assert [s.id for s in page] == [s.id for s in everything[start:end]]
+
+
+def test_slice_skips_months_before_start(store):
+    # Третья страница по 3 лежит целиком в текущем месяце
+    store.cold_cache.clear()
+    store.slice("", 6, 9)
+    assert not store.cold_cache
+
+
+def test_totals_survive_restart(store):
+    reopened = SalesStore(store.directory, Sale)
+    assert reopened.month_totals("2020-01")["count"] == 3
+    assert reopened.day_totals("2020-02-01")["items_sold"] == 2
+    assert reopened.count() == 9
+
+
+def test_get_reads_only_the_sale_month(store):
+    old_sale = next(iter(store._read_sealed("2020-02").values()))
+    store.cold_cache.clear()
+
+    assert store.get(old_sale.id) == old_sale
+    assert list(store.cold_cache) == ["2020-02"]
+    assert store.get("2020-01-unknown") is None
+    assert store.get("not-a-sale") is None
+    assert list(store.cold_cache) == ["2020-02", "2020-01"]
+
+
+def test_legacy_file_is_migrated(tmp_path):
+    legacy_sales = [
+        make_sale("2020-01-05 10:00:00", sale_id="legacy-1"),
+        make_sale("2020-03-05 10:00:00", sale_id="legacy-2", quantity=2),
+        make_sale(f"{THIS_MONTH}-01 10:00:00", sale_id="legacy-3"),
+    ]
+    legacy_file = tmp_path / "sales_data.json"
+    with open(legacy_file, "w") as f:
+        json.dump([sale.model_dump() for sale in legacy_sales], f)
+
+    store = SalesStore(tmp_path / "sales", Sale, legacy_file=legacy_file)
+
+    assert store.months() == ["2020-01", "2020-03", THIS_MONTH]
+    assert store.count() == 3
+    assert store.month_totals("2020-03")["items_sold"] == 2
+    assert store.get("legacy-2").quantity_sold == 2
+    assert store.get("legacy-3").sale_date.startswith(THIS_MONTH)
+    with open(tmp_path / "sales" / LEGACY_IDS_FILE) as f:
+        assert json.load(f)["legacy-1"] == "2020-01"
+
+
+def test_interrupted_legacy_migration_is_restarted(tmp_path, monkeypatch):
+    legacy_sales = [
+        make_sale("2020-01-05 10:00:00", sale_id="legacy-1"),
+        make_sale("2020-03-05 10:00:00", sale_id="legacy-2"),
+    ]
+    legacy_file = tmp_path / "sales_data.json"
+    with open(legacy_file, "w") as f:
+        json.dump([sale.model_dump() for sale in legacy_sales], f)
+
+    write_atomic = sales_store.write_atomic
+    calls = []
+
+    def crash_on_second_write(path, data):
+        calls.append(path)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        write_atomic(path, data)
+
+    monkeypatch.setattr(sales_store, "write_atomic", crash_on_second_write)
+    with pytest.raises(OSError):
+        SalesStore(tmp_path / "sales", Sale, legacy_file=legacy_file)
+    assert not (tmp_path / "sales").exists()
+
+    monkeypatch.setattr(sales_store, "write_atomic", write_atomic)
+    store = SalesStore(tmp_path / "sales", Sale, legacy_file=legacy_file)
+    assert store.count() == 2
+    assert store.get("legacy-1") is not None
+    assert not (tmp_path / "sales.tmp").exists()
+
+
+def test_legacy_ids_rebuilt_for_existing_directory(store):
+    (store.directory / LEGACY_IDS_FILE).unlink()
+    with open(store.directory / f"{THIS_MONTH}.json") as f:
+        data = json.load(f)
+    data[0]["id"] = "plain-uuid"
+    with open(store.directory / f"{THIS_MONTH}.json", "w") as f:
+        json.dump(data, f)
+
+    reopened = SalesStore(store.directory, Sale)
+    assert reopened.legacy_ids == {"plain-uuid": THIS_MONTH}
+    assert reopened.get("plain-uuid") is not None
+
+
+def test_velocity_windows_match_full_scan():
+    rng = random.Random(7)
+    history = ItemSalesHistory()
+    added = []
+    now = datetime(2024, 3, 1)
+    for step in range(300):
+        # Продажи приходят не по порядку, в том числе старше окон
+        sale_date = now - timedelta(days=rng.uniform(-1, 45))
+        sale = SimpleNamespace(
+            id=str(step),
+            sale_date=sale_date.strftime("%Y-%m-%d %H:%M:%S"),
+            quantity_sold=rng.randint(1, 5),
+            sale_price=1.0,
+        )
+        history.add(sale)
+        added.append(sale)
+
+        if step % 7 == 0:
+            now += timedelta(hours=rng.uniform(0, 30))
+            if step % 5 == 0:
+                # Как при закрытии месяца: индекс обрезается по началу окна
+                floor = now - timedelta(days=30 + rng.uniform(0, 3))
+                history.trim(floor.strftime("%Y-%m-%d %H:%M:%S"), now)
+                assert all(entry.sale_date >= history.floor for entry in history.entries)
+            velocity = history.velocity(now)
+            for days, rate in velocity.items():
+                cutoff = (now - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+                units = sum(s.quantity_sold for s in added if s.sale_date >= cutoff)
+                assert rate == units / days
+    assert history.floor
+
+
+def test_index_does_not_read_sealed_months(store, monkeypatch):
+    def read_sealed(self, month):
+        raise AssertionError(f"{month} read at startup")
+
+    monkeypatch.setattr(SalesStore, "_read_sealed", read_sealed)
+    reopened = SalesStore(store.directory, Sale)
+    entries = reopened.item_history("item-1").entries
+    assert [entry.sale_date[:7] for entry in entries] == [THIS_MONTH] * 3
+
+
+def test_item_sales_reads_item_file_not_segments(store, monkeypatch):
+    def read_sealed(self, month):
+        raise AssertionError(f"{month} segment read")
+
+    monkeypatch.setattr(SalesStore, "_read_sealed", read_sealed)
+    assert len(store.item_sales("item-1", 3)) == 3
+
+    sales = store.item_sales("item-1", 5)
+    assert [sale.sale_date[:7] for sale in sales] == [THIS_MONTH] * 3 + ["2020-02"] * 2
+    assert sales == sorted(sales, reverse=True)
+    assert len(store.item_sales("item-1", 20)) == 9
+    assert store.item_sales("missing", 5) == []
+
+
+def test_item_files_rebuilt_for_existing_directory(store):
+    expected = store.item_sales("item-1", 20)
+    shutil.rmtree(store.directory / ITEMS_DIR)
+
+    reopened = SalesStore(store.directory, Sale)
+    assert reopened.item_sales("item-1", 20) == expected
+
+
+class MarchFirst(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2024, 3, 1, 12, 0, 0)
+
+
+def test_index_covers_velocity_window_in_sealed_month(tmp_path, monkeypatch):
+    monkeypatch.setattr(sales_store, "datetime", MarchFirst)
+    directory = tmp_path / "sales"
+    directory.mkdir()
+    sales = [
+        make_sale("2024-01-15 10:00:00"),
+        make_sale("2024-01-31 13:00:00", quantity=2),
+        make_sale("2024-02-10 10:00:00", quantity=3),
+    ]
+    for month in ("2024-01", "2024-02"):
+        with open(directory / f"{month}.json", "w") as f:
+            json.dump([s.model_dump() for s in sales if s.sale_date.startswith(month)], f)
+
+    store = SalesStore(directory, Sale)
+    assert "2024-01" in store.sealed_totals
+    assert store.index_floor == "2024-01-31 12:00:00"
+
+    history = store.item_history("item-1")
+    assert [entry.sale_date for entry in history.entries] == [
+        "2024-01-31 13:00:00",
+        "2024-02-10 10:00:00",
+    ]
+    assert history.velocity(MarchFirst.now())[30] == 5 / 30
+    assert [s.sale_id for s in store.item_sales("item-1", 10)] == [
+        s.id for s in reversed(sales)
+    ]
+
+
+def test_item_total_comes_from_month_totals(store):
+    assert store.item_total("item-1") == {"quantity": 9, "revenue": 90.0}
+    assert store.item_total("missing") == {"quantity": 0, "revenue": 0.0}
@@ -0,0 +1,117 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+VERSIONS_DIR = Path(__file__).parent.parent / "src" / "migration" / "versions"
+REVISIONS = ["418a0dd90a7a_initial_revision", "7c2e9b41d5a3_sales_summary_tables"]
+
+
+def load_revision(name: str):
+    spec = importlib.util.spec_from_file_location(name, VERSIONS_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def connection(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'seven.db'}")
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            for name in REVISIONS:
+                load_revision(name).upgrade()
+        for item_id in (1, 2):
+            connection.execute(
+                sa.text(
+                    "INSERT INTO items (id, name, articule, price, quantity) "
+                    "VALUES (:id, :name, :name, 5.0, 100)"
+                ),
+                {"id": item_id, "name": f"item-{item_id}"},
+            )
+        yield connection
+    engine.dispose()
+
+
+def add_sale(connection, sale_id, item_id, quantity, amount, sold_at):
+    connection.execute(
+        sa.text(
+            "INSERT INTO sales (id, item_id, quantity, amount, sold_at) "
+            "VALUES (:id, :item_id, :quantity, :amount, :sold_at)"
+        ),
+        {
+            "id": sale_id,
+            "item_id": item_id,
+            "quantity": quantity,
+            "amount": amount,
+            "sold_at": sold_at,
+        },
+    )
+
+
+def daily(connection):
+    rows = connection.execute(
+        sa.text("SELECT day, sales_count, items_sold, revenue FROM daily_sales_summary ORDER BY day")
+    )
+    return [tuple(row) for row in rows]
+
+
+def per_item(connection):
+    rows = connection.execute(
+        sa.text(
+            "SELECT item_id, sales_count, items_sold, revenue, last_sold_at "
+            "FROM item_sales_summary ORDER BY item_id"
+        )
+    )
+    return [tuple(row) for row in rows]
+
+
+def test_insert_adds_to_both_summaries(connection):
+    add_sale(connection, 1, 1, 2, 10.0, "2026-10-01 10:00:00")
+    add_sale(connection, 2, 1, 1, 5.0, "2026-10-01 12:00:00")
+    add_sale(connection, 3, 2, 3, 15.0, "2026-10-02 09:00:00")
+
+    assert daily(connection) == [("2026-10-01", 2, 3, 15.0), ("2026-10-02", 1, 3, 15.0)]
+    assert per_item(connection) == [
+        (1, 2, 3, 15.0, "2026-10-01 12:00:00"),
+        (2, 1, 3, 15.0, "2026-10-02 09:00:00"),
+    ]
+
+
+def test_update_moves_sale_between_item_and_day(connection):
+    add_sale(connection, 1, 1, 2, 10.0, "2026-10-01 10:00:00")
+    add_sale(connection, 2, 1, 1, 5.0, "2026-10-01 12:00:00")
+
+    connection.execute(
+        sa.text(
+            "UPDATE sales SET item_id = 2, sold_at = '2026-10-03 08:00:00', "
+            "quantity = 4, amount = 20.0 WHERE id = 2"
+        )
+    )
+
+    assert daily(connection) == [("2026-10-01", 1, 2, 10.0), ("2026-10-03", 1, 4, 20.0)]
+    # last_sold_at первого товара пересчитан по оставшимся продажам
+    assert per_item(connection) == [
+        (1, 1, 2, 10.0, "2026-10-01 10:00:00"),
+        (2, 1, 4, 20.0, "2026-10-03 08:00:00"),
+    ]
+
+
+def test_delete_subtracts_and_removes_empty_rows(connection):
+    add_sale(connection, 1, 1, 2, 10.0, "2026-10-01 10:00:00")
+    add_sale(connection, 2, 1, 1, 5.0, "2026-10-02 12:00:00")
+    add_sale(connection, 3, 2, 3, 15.0, "2026-10-02 09:00:00")
+
+    connection.execute(sa.text("DELETE FROM sales WHERE id = 2"))
+    assert daily(connection) == [("2026-10-01", 1, 2, 10.0), ("2026-10-02", 1, 3, 15.0)]
+    assert per_item(connection) == [
+        (1, 1, 2, 10.0, "2026-10-01 10:00:00"),
+        (2, 1, 3, 15.0, "2026-10-02 09:00:00"),
+    ]
+
+    connection.execute(sa.text("DELETE FROM sales WHERE item_id = 2"))
+    assert daily(connection) == [("2026-10-01", 1, 2, 10.0)]
+    assert per_item(connection) == [(1, 1, 2, 10.0, "2026-10-01 10:00:00")]